@@ -1,6 +1,5 @@
 import os
 import sys
-from langchain_groq import ChatGroq
 
 current_file_path = os.path.abspath(__file__)
 current_dir = os.path.dirname(current_file_path)
@@ -10,18 +9,11 @@ sys.path.append(current_dir)
 sys.path.append(parent_dir)
     
 from src.config import settings, logger
-
-os.environ["GROQ_API_KEY"] = settings.GROQ_API_KEY
+from src.llm_chats import Chatgroq, client_pool  # Chatgroq checks and exports GROQ_API_KEY
 
 try:
-    llm = ChatGroq(
-        model=settings.MODEL_NAME,
-        temperature=settings.TEMPERATURE,
-        max_tokens=settings.MAX_TOKENS,
-        reasoning_format="parsed",
-        timeout=settings.TIMEOUT,
-        max_retries=settings.MAX_RETERIES,
-    )
+    # pooled client, so CASSETTE_MODE record/replay applies to this example too
+    llm = client_pool.get_chat_model(settings.MODEL_NAME, reasoning_format="parsed")
 
     messages = [
         (
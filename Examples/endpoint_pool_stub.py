@@ -0,0 +1,81 @@
+"""
+Least-latency routing against local stub servers, no API key or network needed.
+
+Starts three OpenAI-compatible stubs (fast, slow and one that always fails), sends requests through an
+EndpointPool and prints where they were routed. Needs the optional langchain-openai package.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+os.environ.setdefault("GROQ_API_KEY", "not-needed")
+
+from src.config import settings
+from src.llm_chats.endpoint_pool import Endpoint, EndpointPool
+
+# no client-side retries, a failing stub should count at once
+settings.MAX_RETERIES = 0
+
+
+def stub_server(delay: float, fail: bool = False) -> str:
+    """Start an OpenAI-compatible stub in a thread and return its base URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict) -> None:
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            self._reply(500 if fail else 200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            if fail:
+                return self._reply(500, {"error": {"message": "stub failure"}})
+            self._reply(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"answered after {delay}s"}}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+            })
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+
+async def main():
+    pool = EndpointPool(
+        [
+            Endpoint("slow", kind="openai", base_url=stub_server(0.3), model="stub"),
+            Endpoint("fast", kind="openai", base_url=stub_server(0.05), model="stub"),
+            Endpoint("broken", kind="openai", base_url=stub_server(0.0, fail=True), model="stub"),
+        ],
+        eject_after=1,
+    )
+    for i in range(8):
+        response = await pool.ainvoke([("human", "hi")])
+        print(f"request {i}: {response.response_metadata['endpoint']:>6} -> {response.content}")
+    await pool.check_health()
+    for endpoint in pool.endpoints:
+        ewma = f"{endpoint.ewma:.3f}s" if endpoint.ewma is not None else "-"
+        print(f"{endpoint.name:>6}: healthy={endpoint.healthy} ewma={ewma} stats={endpoint.stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
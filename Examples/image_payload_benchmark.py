@@ -0,0 +1,58 @@
+"""
+Bytes and latency of visual payloads before and after preprocessing.
+
+Compares the raw base64 encoding that visual_path used to send with the downscaled/re-encoded payload,
+cold and from the content-hash cache. Runs offline on a generated photo-like PNG, or on images given as arguments.
+"""
+import base64
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from PIL import Image, ImageFilter
+
+from src.utils import image_preprocessing
+
+
+def make_sample(path: str, size: tuple[int, int] = (4032, 3024)) -> None:
+    """Write a noisy, smooth-ish PNG of roughly phone-camera size."""
+    noise = Image.effect_noise(size, 64).filter(ImageFilter.GaussianBlur(2))
+    Image.merge("RGB", (noise, noise.rotate(180), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(path)
+
+
+def timed(func, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def raw_data_url(path: str) -> str:
+    with open(path, "rb") as image_file:
+        return f"data:image/jpeg;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
+
+
+def main(paths: list[str]) -> None:
+    if not paths:
+        sample = os.path.join(tempfile.gettempdir(), "image_payload_benchmark.png")
+        if not os.path.exists(sample):
+            make_sample(sample)
+        paths = [sample]
+    for path in paths:
+        raw_ms, raw = timed(raw_data_url, path)
+        cold_ms, processed = timed(image_preprocessing.to_data_url, path)
+        warm_ms, _ = timed(image_preprocessing.to_data_url, path)
+        print(f"{os.path.basename(path)} ({os.path.getsize(path) / 1e6:.1f} MB on disk)")
+        print(f"  raw base64      : {len(raw) / 1e6:8.2f} MB  {raw_ms:8.1f} ms")
+        print(f"  preprocessed    : {len(processed) / 1e6:8.2f} MB  {cold_ms:8.1f} ms  "
+              f"({processed[5:processed.index(';')]})")
+        print(f"  cached          : {len(processed) / 1e6:8.2f} MB  {warm_ms:8.1f} ms")
+        print(f"  payload shrink  : {len(raw) / len(processed):.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
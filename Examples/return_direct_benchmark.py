@@ -0,0 +1,94 @@
+"""
+Latency and model calls per turn with and without direct-return tools.
+
+Loads the calculator and weather MCP servers and answers every query with two agents over the same tools: one with the
+tools of settings.TOOL_RETURN_DIRECT marked direct-return, where the tool output ends the turn, and one where the
+model restates it in a second call. Turns are streamed through Agent.stream_events and the median turn time, the model
+calls and the reported tokens are printed. The tool result cache is cleared before every turn so both agents run the
+tools. Requires GROQ_API_KEY.
+
+    python Examples/return_direct_benchmark.py [--runs 3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from src.agents_utils import tool_cache
+from src.agents_utils.agent import Agent
+from src.config import settings
+from src.utils import async_runner, stream_events
+
+QUERIES = [
+    "What is sqrt(2) * 17.5?",
+    "Calculate (3 + 4) ** 5 / 7",
+    "What is the weather in Berlin right now?",
+    "Give me the weather forecast for Tokyo",
+]
+
+servers = Path(parent_dir) / "src" / "mcp_servers"
+mcp_config = {
+    "calculator_mcp": {
+        "transport": "stdio",
+        "command": sys.executable,
+        "args": [str(servers / "calculator_mcp.py")],
+    },
+    "weather_mcp": {
+        "transport": "stdio",
+        "command": sys.executable,
+        "args": [str(servers / "weather_mcp.py")],
+    },
+}
+
+
+async def turn(agent: Agent, query: str) -> tuple[float, int, int]:
+    """Seconds of one turn, its model calls and its reported input + output tokens."""
+    start, calls, tokens = time.perf_counter(), 0, 0
+    async for event in agent.stream_events(query, messages=[]):
+        if isinstance(event, stream_events.Usage):
+            calls += 1
+            tokens += event.input_tokens + event.output_tokens
+    return time.perf_counter() - start, calls, tokens
+
+
+def main(runs: int) -> None:
+    if not settings.GROQ_API_KEY:
+        sys.exit("Set GROQ_API_KEY to run the benchmark.")
+    tools = asyncio.run(MultiServerMCPClient(mcp_config).get_tools())
+    # separate tool objects, so the baseline compiles its own graph without the return_direct exit
+    plain_tools = [t.model_copy() for t in tools]
+    marked, settings.TOOL_RETURN_DIRECT = settings.TOOL_RETURN_DIRECT, {}
+    baseline = Agent(tools=plain_tools, show_graph=False)
+    settings.TOOL_RETURN_DIRECT = marked
+    direct = Agent(tools=tools, show_graph=False)
+    print(f"Direct-return tools: {sorted(t.name for t in tools if t.return_direct)}\n")
+
+    for query in QUERIES:
+        results = {"model restates": [], "direct return": []}
+        for _ in range(runs):
+            for name, agent in (("model restates", baseline), ("direct return", direct)):
+                tool_cache.get_cache().clear()
+                results[name].append(async_runner.run(turn(agent, query)))
+        print(query)
+        for name, samples in results.items():
+            seconds = statistics.median(s[0] for s in samples)
+            calls = statistics.median(s[1] for s in samples)
+            tokens = statistics.median(s[2] for s in samples)
+            print(f"  {name:15s}: {seconds * 1000:6.0f} ms, {calls:.0f} model calls, {tokens:6.0f} tokens "
+                  f"(median of {runs})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=3, help="turns per query and agent")
+    args = parser.parse_args()
+    main(args.runs)
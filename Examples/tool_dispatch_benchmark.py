@@ -0,0 +1,179 @@
+"""
+Turn latency with tools started after the AI message ("message") or as soon as each call is parsed ("streaming").
+
+Offline (default) a scripted chat model streams three tool calls at a fixed pace to a graph with the Agent's tool
+middleware, and the tools simulate I/O of different lengths (a slow web search, quick weather and Wikipedia lookups).
+It prints the median turn time of both dispatch modes, how much tool time overlapped with generation, and checks that
+both modes give the same messages. With --live (needs GROQ_API_KEY and the MCP servers) it times the General bot's
+agent with both modes instead.
+
+    python Examples/tool_dispatch_benchmark.py [--runs 5] [--pace 0.2] [--live]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.tools import tool
+
+from src.agents_utils import direct_return, request_budget, tool_cache, tool_dispatch, tool_execution, tool_retry
+from src.utils import async_runner
+
+# (tool, arguments, simulated seconds of I/O), in the order the model streams them
+CALLS = [
+    ("web_search", {"query": "latest python release"}, 1.2),
+    ("get_weather", {"loc": "Berlin"}, 0.4),
+    ("wikipedia", {"query": "Ada Lovelace"}, 0.6),
+]
+DURATIONS = {name: seconds for name, _, seconds in CALLS}
+LIVE_QUERIES = [
+    "What's the weather in Berlin and Tokyo, and who was Ada Lovelace?",
+    "Search the web for the latest Python release and tell me the time in New York",
+]
+
+
+@tool
+async def web_search(query: str) -> str:
+    """Search the web."""
+    await asyncio.sleep(DURATIONS["web_search"])
+    return f"results for {query}"
+
+
+@tool
+async def get_weather(loc: str) -> str:
+    """Current weather of a location."""
+    await asyncio.sleep(DURATIONS["get_weather"])
+    return f"sunny in {loc}"
+
+
+@tool
+async def wikipedia(query: str) -> str:
+    """Look a topic up on Wikipedia."""
+    await asyncio.sleep(DURATIONS["wikipedia"])
+    return f"article on {query}"
+
+
+class ScriptedModel(BaseChatModel):
+    """Streams the tool calls of CALLS in two chunks each, `pace` seconds apart, then answers from the results."""
+    pace: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(**kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # the same pace without streaming, as the provider would still generate token by token
+        message = None
+        async for chunk in self._astream(messages, stop, **kwargs):
+            message = chunk.message if message is None else message + chunk.message
+        return ChatResult(generations=[ChatGenerationChunk(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        results = [m.content for m in messages if isinstance(m, ToolMessage)]
+        if results:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="Answer: " + "; ".join(results)))
+            return
+        for index, (name, args, _) in enumerate(CALLS):
+            text = json.dumps(args)
+            for part, head in ((text[:len(text) // 2], True), (text[len(text) // 2:], False)):
+                await asyncio.sleep(self.pace)
+                yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                    "name": name if head else None, "id": f"call_{index}" if head else None,
+                    "args": part, "index": index,
+                }]))
+
+
+def build_graph(streaming: bool, pace: float):
+    """The Agent's middleware stack around the scripted model."""
+    tools = [web_search, get_weather, wikipedia]
+    inner = [
+        direct_return.DirectReturnMiddleware(),
+        tool_cache.ToolCacheMiddleware(),
+        tool_retry.ToolRetryMiddleware(),
+        tool_execution.ToolExecutionMiddleware(),
+    ]
+    dispatch = tool_dispatch.StreamingDispatchMiddleware(tools, inner) if streaming else None
+    middleware = [request_budget.BudgetMiddleware()] + ([dispatch] if dispatch else []) + inner
+    return create_agent(ScriptedModel(pace=pace), tools, middleware=middleware), dispatch
+
+
+async def offline_turn(graph, dispatch) -> tuple[float, list]:
+    tool_cache.get_cache().clear()
+    dispatcher = dispatch.dispatcher() if dispatch else None
+    start = time.perf_counter()
+    with tool_dispatch.scope(dispatcher):
+        config = {"callbacks": [dispatcher]} if dispatcher else None
+        state = await graph.ainvoke({"messages": [{"role": "user", "content": "go"}]}, config=config)
+    return time.perf_counter() - start, [(type(m).__name__, m.content) for m in state["messages"]]
+
+
+def offline(runs: int, pace: float) -> None:
+    generation = 2 * len(CALLS) * pace
+    print(f"{len(CALLS)} tool calls streamed over {generation:.2f}s, tool I/O {[c[2] for c in CALLS]} s\n")
+    outputs = {}
+    for mode in ("message", "streaming"):
+        graph, dispatch = build_graph(mode == "streaming", pace)
+        samples = [async_runner.run(offline_turn(graph, dispatch)) for _ in range(runs)]
+        outputs[mode] = samples[-1][1]
+        print(f"  {mode:9s}: {statistics.median(s[0] for s in samples) * 1000:6.0f} ms (median of {runs})")
+    # the tool node can only start after the last chunk; streaming dispatch starts call i after chunk 2(i+1)
+    message_bound = generation + max(c[2] for c in CALLS)
+    streaming_bound = max(2 * (i + 1) * pace + c[2] for i, c in enumerate(CALLS))
+    print(f"\n  expected  : {message_bound * 1000:6.0f} -> {streaming_bound * 1000:6.0f} ms, "
+          f"{(message_bound - streaming_bound) * 1000:.0f} ms of tool I/O overlapped with generation")
+    print(f"  same messages in both modes: {outputs['message'] == outputs['streaming']}")
+    print(f"  dispatch stats: {tool_dispatch.stats}")
+
+
+async def live_turn(agent, query: str) -> float:
+    start = time.perf_counter()
+    async for _ in agent.stream_events(query, messages=[]):
+        pass
+    return time.perf_counter() - start
+
+
+def live(runs: int) -> None:
+    from src.agents.General import general_bot_tools
+    from src.agents_utils.agent import Agent
+
+    agents = {mode: Agent(tools=general_bot_tools.tools, show_graph=False, tool_dispatch=mode)
+              for mode in ("message", "streaming")}
+    for query in LIVE_QUERIES:
+        print(query)
+        timings = {mode: [] for mode in agents}
+        for _ in range(runs):
+            for mode, agent in agents.items():
+                tool_cache.get_cache().clear()
+                timings[mode].append(async_runner.run(live_turn(agent, query)))
+        for mode, samples in timings.items():
+            print(f"  {mode:9s}: {statistics.median(samples) * 1000:6.0f} ms (median of {runs})")
+    print(f"dispatch stats: {tool_dispatch.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5, help="turns per dispatch mode (and query)")
+    parser.add_argument("--pace", type=float, default=0.2, help="seconds between streamed chunks, offline")
+    parser.add_argument("--live", action="store_true", help="time the General bot against Groq")
+    args = parser.parse_args()
+    if args.live:
+        live(args.runs)
+    else:
+        offline(args.runs, args.pace)
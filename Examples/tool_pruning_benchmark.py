@@ -0,0 +1,98 @@
+"""
+Prompt tokens and time to first token with and without per-query tool pruning.
+
+Loads the General bot toolset (knowledge tools plus the time, calculator, weather and Tavily MCP servers), then for
+every query compares the tool-schema tokens of the full set with the TOOL_PRUNING_TOP_K tools that ToolIndex selects.
+With a GROQ_API_KEY (and without --offline) each query is also streamed to MODEL_NAME with both tool sets, alternating,
+and the median time to first token and the reported input tokens are printed, followed by the share of input tokens
+served from the prompt cache (prompt_cache.cached_ratio) with and without pruning: the full set keeps the tool schemas
+of every call identical, the pruned sets change them per query.
+
+    python Examples/tool_pruning_benchmark.py [--offline] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from src.agents_utils.tool_retrieval import ToolIndex
+from src.config import settings
+from src.llm_chats import client_pool, prompt_cache
+from src.utils import async_runner
+
+QUERIES = [
+    "What time is it in Tokyo right now?",
+    "Will it rain in Berlin over the next three days?",
+    "What is sqrt(2) * 17.5?",
+    "Find recent papers on retrieval augmented generation",
+    "Who was Ada Lovelace?",
+    "Search the web for the latest Python release notes",
+    "Convert the timestamp 1700000000 to a date",
+]
+
+
+async def first_token(llm, query: str) -> tuple[float, int]:
+    """Seconds to the first streamed chunk and the input tokens reported for the call."""
+    start, ttft, input_tokens = time.perf_counter(), None, 0
+    async for chunk in llm.astream([{"role": "user", "content": query}]):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        if chunk.usage_metadata:
+            input_tokens = chunk.usage_metadata.get("input_tokens", input_tokens)
+    return ttft or 0.0, input_tokens
+
+
+def main(offline: bool, runs: int) -> None:
+    from src.agents.General import general_bot_tools
+
+    tools = general_bot_tools.tools
+    index = ToolIndex(tools)
+    full_tokens = sum(index.schema_tokens.values())
+    print(f"{len(tools)} tools, {full_tokens} estimated schema tokens, top-k {settings.TOOL_PRUNING_TOP_K}\n")
+
+    live = not offline and bool(settings.GROQ_API_KEY)
+    full_llm = client_pool.get_chat_model(settings.MODEL_NAME).bind_tools(tools)
+    prompt_stats = {name: {"input_tokens": 0, "cached_tokens": 0} for name in ("full", "pruned")}
+    for query in QUERIES:
+        selected = index.select(query, settings.TOOL_PRUNING_TOP_K) or tools
+        pruned_tokens = sum(index.schema_tokens[t.name] for t in selected)
+        print(f"{query}")
+        print(f"  tools bound     : {[t.name for t in selected]}")
+        print(f"  schema tokens   : {full_tokens:6d} -> {pruned_tokens:6d}")
+        if not live:
+            continue
+        pruned_llm = client_pool.get_chat_model(settings.MODEL_NAME).bind_tools(selected)
+        timings = {"full": [], "pruned": []}
+        reported = {}
+        for _ in range(runs):
+            for name, llm in (("full", full_llm), ("pruned", pruned_llm)):
+                before = dict(prompt_cache.stats)
+                ttft, input_tokens = async_runner.run(first_token(llm, query))
+                for key in prompt_stats[name]:
+                    prompt_stats[name][key] += prompt_cache.stats[key] - before[key]
+                timings[name].append(ttft)
+                reported[name] = input_tokens
+        print(f"  input tokens    : {reported['full']:6d} -> {reported['pruned']:6d} (reported)")
+        print(f"  first token     : {statistics.median(timings['full']) * 1000:6.0f} -> "
+              f"{statistics.median(timings['pruned']) * 1000:6.0f} ms (median of {runs})")
+    if not live:
+        print("\nOffline run: set GROQ_API_KEY and drop --offline to measure time to first token.")
+        return
+    print("\nprompt cache hit ratio (cached / input tokens):")
+    for name, counts in prompt_stats.items():
+        ratio = counts["cached_tokens"] / counts["input_tokens"] if counts["input_tokens"] else 0.0
+        print(f"  {name:6s}: {ratio:6.1%} of {counts['input_tokens']} input tokens")
+    print(f"  overall: {prompt_cache.cached_ratio():6.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--offline", action="store_true", help="only compare estimated schema tokens")
+    parser.add_argument("--runs", type=int, default=3, help="streamed calls per query and tool set")
+    args = parser.parse_args()
+    main(args.offline, args.runs)
@@ -165,6 +165,7 @@ def main() -> None:
                     chat_history_limit=8,
                     show_graph=False,
                     tools=tools,
+                    cache_namespace=selected_bot,
                 )
                 st.session_state.bot_started = True
                 st.session_state.messages = []
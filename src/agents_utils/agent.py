@@ -1,6 +1,6 @@
-from typing import Annotated, Any, Literal, Tuple, List
+from typing import Annotated, Any, AsyncIterator, Optional, Tuple, List
 import asyncio
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
 from langgraph.graph.state import CompiledStateGraph
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
@@ -9,9 +9,29 @@ from langchain.agents import create_agent
 from PIL import Image
 import io
 
-from src.llm_chats import Chatgroq
+from src.agents_utils import (
+    compaction, context_window, direct_return, graph_registry, request_budget, tool_cache, tool_dispatch,
+    tool_execution, tool_retrieval, tool_retry,
+)
+from src.config import settings
+from src.llm_chats import Chatgroq, prompt_cache, response_cache, semantic_cache
+from src.utils import batching, history_transforms, stream_events
 from src.utils.logging_config import get_logger
-from src.utils.react_streaming import updates_steaming, messages_steaming
+
+
+def tool_wrappers() -> list:
+    """
+    Tool middleware of the agent graph, outermost first. Direct-return handling sees the final outcome of a call,
+    including the error messages of timeouts and exceptions, so a failed direct-return tool goes back to the model.
+    The cache comes next, so hits skip the retries, concurrency limits and timeouts, and every retry gets its own
+    slot and timeout.
+    """
+    return [
+        direct_return.DirectReturnMiddleware(),
+        tool_cache.ToolCacheMiddleware(),
+        tool_retry.ToolRetryMiddleware(),
+        tool_execution.ToolExecutionMiddleware(),
+    ]
 
 
 class Agent:
@@ -21,84 +41,193 @@ class Agent:
             system_text: str = "You are a helpful agent that can use tools to answer user queries.",
             chat_history_limit: int = 8,
             tools: list = None,
-            show_graph: bool = True
+            show_graph: bool = True,
+            cache_namespace: str = None,
+            context_token_budget: int = None,
+            deadline: float = None,
+            max_iterations: int = None,
+            tool_dispatch: str = None
     ):
-        if tools is None:
-            tools = []
-        try:
-            system_text = (f"{system_text} \n"
-                           f"AVAILABLE Tools: {[t.name for t in tools]}") if len(tools) > 0 else system_text
-        except:
-            pass
+        tools = prompt_cache.stable_tools(direct_return.apply_settings(tools or []))
+        # built once and never re-formatted, the static prefix of every request
+        system_text = prompt_cache.static_system_text(system_text, tools)
 
         self.groq = Chatgroq.Groq()
         self.system_text = system_text
+        self.cache_namespace = semantic_cache.namespace_of(system_text, cache_namespace)
+        # end-to-end budget of every request, see request_budget.py
+        self.deadline, self.max_iterations = request_budget.budget_of(cache_namespace, deadline, max_iterations)
 
         self.limit = chat_history_limit
+        self.context = context_window.create(chat_history_limit, context_token_budget)
+        self.compactor = compaction.Compactor(self.context)
+        self.tool_dispatch = tool_dispatch or settings.TOOL_DISPATCH
         self.agent = self.create_workflow(tools=tools, show_graph=show_graph)
         get_logger().info("Agent created")
 
-    async def ask(self, query: str, messages: list = None) -> tuple[BaseMessage, list | None]:
+    async def ask(self, query: str, messages: list = None, cache: bool = True) -> tuple[BaseMessage, list | None]:
         """
         Process user messages
         :param query: user query
         :param messages: chat history or conversation [{"role": "system", "content": ...}, ...]
+        :param cache: whether to serve/store the final answer from/in the response caches
         :return: updated state's output and messages
         """
         messages = [] if not messages else messages
         messages.append({"role": "user", "content": query})
-        response = await self.agent.ainvoke(
-            {"messages":
-                 [{"role": "system", "content": self.system_text}] + messages[-self.limit:]
-             },
-        )
-        messages.append({"role": "assistant", "content": response['messages'][-1].content})
-        return response['messages'][-1].content, messages
-
-    async def stream_ask(
-            self, query: str, messages: list = None,
-            mode: Literal["values", "updates", "messages"] = "updates"
-    ) -> tuple[Any, list[Any] | list | None]:
+        window = self._window(messages)
+        request = prompt_cache.assemble(self.system_text, window)
+        key = None
+        if cache and settings.RESPONSE_CACHE:
+            key = response_cache.make_key(settings.MODEL_NAME, settings.TEMPERATURE, settings.MAX_TOKENS, request)
+            cached = response_cache.get_cache().get(key)
+            if cached is not None:
+                messages.append({"role": "assistant", "content": cached.content})
+                self.compactor.schedule(messages)
+                return cached.content, messages
+        if cache and (answer := semantic_cache.lookup(self.cache_namespace, window)) is not None:
+            messages.append({"role": "assistant", "content": answer})
+            self.compactor.schedule(messages)
+            return answer, messages
+        dispatcher = self._dispatcher()
+        with request_budget.scope(self.deadline, self.max_iterations) as budget, tool_dispatch.scope(dispatcher):
+            response = await self.agent.ainvoke({"messages": request}, config=self._run_config(dispatcher))
+        last = response['messages'][-1]
+        answer = direct_return.final_answer(response['messages'])
+        # answers built on tool results are left to the tool cache and its per-tool TTLs (a whole-answer entry would
+        # outlive a fresh weather report), answers cut short by the request budget are not cached at all
+        used_tools = any(isinstance(m, ToolMessage) for m in response['messages'][len(request):])
+        if cache and isinstance(last, AIMessage) and not used_tools and not budget.exhausted:
+            if key:
+                response_cache.get_cache().put(key, last)
+            semantic_cache.store(self.cache_namespace, window, answer)
+        messages.append({"role": "assistant", "content": answer})
+        self.compactor.schedule(messages)
+        return answer, messages
+
+    async def ask_light(self, query: str, messages: list = None) -> tuple[str, list]:
         """
-        Process user messages
+        Answer without tools on the backup model, for turns the query router classified as trivial
         :param query: user query
-        :param messages: chat history or conversation
-        :param mode: mode of streaming Literal["updates", "messages"]
-        :return: updated state's output and messages
+        :param messages: chat history, left unchanged if the call fails
+        :return: answer and updated messages
         """
-        content, token_usage = "", {'Input': 0, 'Output': 0}
         messages = [] if not messages else messages
+        window = self._window(messages + [{"role": "user", "content": query}])
+        timeout = min(settings.TIMEOUT, self.deadline or settings.TIMEOUT)
+        response = await self.groq.backup_llm.ainvoke(prompt_cache.assemble(self.system_text, window), timeout=timeout)
         messages.append({"role": "user", "content": query})
-        content = ""
-        async for message_chunk in self.agent.astream(
-                {"messages":
-                     [{"role": "system", "content": self.system_text}] + messages[-self.limit:]
-                 },
-                stream_mode=mode,
-        ):
-            if mode == "updates":
-                content, token_usage = updates_steaming(message_chunk, token_usage)
-            elif mode == "messages":
-                chunk, token_usage = messages_steaming(message_chunk, token_usage)
-                content += str(chunk)
-            else:
-                print(messages)
-                content = message_chunk
-        messages.append({"role": "assistant", "content": content})
-        return content, messages
+        messages.append({"role": "assistant", "content": response.content})
+        self.compactor.schedule(messages)
+        return response.content, messages
+
+    async def ask_many(self, queries: list[str], max_concurrency: int = 8, cache: bool = True) -> list:
+        """
+        Answer many independent queries concurrently, each with an empty history
+        :param queries: user queries
+        :param max_concurrency: maximum number of agent runs in flight
+        :param cache: whether to use the response caches
+        :return: answers in input order; a failed item holds its exception instead of the answer
+        """
+        async def answer(query: str):
+            response, _ = await self.ask(query, messages=[], cache=cache)
+            return response
+
+        results = await batching.map_concurrent(answer, queries, max_concurrency=max_concurrency)
+        failed = sum(isinstance(r, Exception) for r in results)
+        if failed:
+            get_logger().warning(f"ask_many: {failed}/{len(results)} queries failed")
+        return results
+
+    async def stream_events(self, query: str, messages: list = None) -> AsyncIterator[stream_events.Event]:
+        """
+        Process user messages, yielding typed events as they happen (see utils/stream_events.py)
+        :param query: user query
+        :param messages: chat history or conversation, updated when the run finishes
+        :return: async iterator of TokenDelta, ToolStart, ToolEnd and Usage events, ending with Final
+        """
+        messages = [] if not messages else messages
+        messages.append({"role": "user", "content": query})
+        dispatcher = self._dispatcher()
+        with request_budget.scope(self.deadline, self.max_iterations), tool_dispatch.scope(dispatcher):
+            stream = self.agent.astream(
+                {"messages": prompt_cache.assemble(self.system_text, self._window(messages))},
+                config=self._run_config(dispatcher),
+                stream_mode=["messages", "updates"],
+            )
+            async for event in stream_events.graph_events(stream):
+                if isinstance(event, stream_events.Final):
+                    messages.append({"role": "assistant", "content": event.content})
+                    self.compactor.schedule(messages)
+                    event.messages = messages
+                yield event
+
+    async def stream_ask(self, query: str, messages: list = None) -> tuple[Any, list[Any] | list | None]:
+        """
+        Process user messages through the event stream and return the final answer
+        :param query: user query
+        :param messages: chat history or conversation
+        :return: updated state's output and messages
+        """
+        token_usage = {'Input': 0, 'Output': 0, 'Cached': 0}
+        final = None
+        async for event in self.stream_events(query, messages=messages):
+            if isinstance(event, stream_events.Usage):
+                token_usage['Input'] += event.input_tokens
+                token_usage['Output'] += event.output_tokens
+                token_usage['Cached'] += event.cached_tokens
+            elif isinstance(event, stream_events.ToolEnd):
+                get_logger().info(f"Tool {event.name} finished ({event.status}) in {event.duration or 0:.2f}s")
+            elif isinstance(event, stream_events.Final):
+                final = event
+        get_logger().info(f"Token usage: {token_usage}, prompt cache hit ratio: {prompt_cache.cached_ratio():.0%}")
+        return final.content, final.messages
+
+    def _window(self, messages: list) -> list:
+        """
+        History sent to the model: the running summary of older turns and the newest messages that fit the
+        context budget, keeping only the newest copy of each image (see self.context.last_trim for the trimming decision)
+        :param messages: full chat history
+        :return: history window
+        """
+        return history_transforms.dedupe_images(self.compactor.window(messages))
+
+    def _dispatcher(self) -> Optional[tool_dispatch.ToolDispatcher]:
+        """Dispatcher of one request in streaming tool dispatch, None in the default dispatch"""
+        return self.streaming_dispatch.dispatcher() if self.streaming_dispatch else None
+
+    @staticmethod
+    def _run_config(dispatcher: Optional[tool_dispatch.ToolDispatcher]) -> Optional[dict]:
+        return {"callbacks": [dispatcher]} if dispatcher is not None else None
 
     def create_workflow(self, tools: list, show_graph: bool = True) -> CompiledStateGraph[Any, Any, Any, Any]:
         """
-        Create react agent workflow
+        Create react agent workflow, shared with every Agent of the same configuration (see graph_registry.py)
         """
-        try:
-            self.system_text += f"\n **AVAILABLE Tools**: {[t.name for t in tools]}"
-        except:
-            pass
-        agent = create_agent(
-            model=self.groq.llm,
-            tools=tools
-        )
+        pruning = settings.TOOL_PRUNING and len(tools) > settings.TOOL_PRUNING_TOP_K
+        streaming = self.tool_dispatch == "streaming"
+        key = graph_registry.graph_key(self.groq.llm, tools, pruning and settings.TOOL_PRUNING_TOP_K, streaming)
+
+        def compile_agent() -> graph_registry.CompiledAgent:
+            tool_pruning = tool_retrieval.ToolPruningMiddleware(tools) if pruning else None
+            tool_middleware = tool_wrappers()
+            # early-started tool calls run through the same tool wrappers
+            dispatch = tool_dispatch.StreamingDispatchMiddleware(tools, tool_middleware) if streaming else None
+            # the budget wraps every model call
+            middleware = [request_budget.BudgetMiddleware()] + ([dispatch] if dispatch else []) + tool_middleware
+            if tool_pruning:
+                middleware.append(tool_pruning)
+            graph = create_agent(
+                model=self.groq.llm,
+                tools=tools,
+                middleware=middleware
+            )
+            return graph_registry.CompiledAgent(graph, tool_pruning, dispatch, tuple(tools))
+
+        compiled = graph_registry.get_or_create(key, compile_agent)
+        self.tool_pruning = compiled.tool_pruning
+        self.streaming_dispatch = compiled.dispatch
+        agent = compiled.graph
         if show_graph:
             # display the workflow
             png_bytes = agent.get_graph().draw_mermaid_png()
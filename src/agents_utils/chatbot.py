@@ -8,6 +8,7 @@ from langchain_core.runnables.graph import MermaidDrawMethod
 from PIL import Image
 import io
 
+from src.agents_utils import compaction, context_window
 from src.llm_chats import Chatgroq
 
 
@@ -24,10 +25,14 @@ class Chatbot:
             self,
             system_text: str = "You are a helpful assistant.",
             chat_history_limit: int = 8,
-            show_graph: bool = True
+            show_graph: bool = True,
+            cache_namespace: str = None,
+            context_token_budget: int = None
     ):
-        self.llm = Chatgroq.Groq(system_text=system_text)
+        self.llm = Chatgroq.Groq(system_text=system_text, cache_namespace=cache_namespace)
         self.limit = chat_history_limit
+        self.context = context_window.create(chat_history_limit, context_token_budget)
+        self.compactor = compaction.Compactor(self.context)
         self.workflow = self.create_workflow(show_graph=show_graph)
 
     def ask(self, query: str, messages: list = None) -> tuple[BaseMessage, list | None]:
@@ -72,8 +77,9 @@ class Chatbot:
         messages = state.get("messages", [])
         query = state.get("input", "")
         messages.append({"role": "user", "content": query})
-        response = self.llm.ask(messages[-self.limit:])
+        response = self.llm.ask(self.compactor.window(messages))
         messages.extend([{"role": "assistant", "content": response.content}])
+        self.compactor.schedule(messages)
         return {
             "output": response.content,
             "messages": messages,
@@ -0,0 +1,179 @@
+"""
+Rolling conversation compaction.
+
+Messages that fall out of the context window are not simply dropped: once the evicted, not yet summarized part of
+the history reaches COMPACTION_TRIGGER_TOKENS it is folded into a running summary by a background call on the
+shared async runner, after the answer was already returned. Reasoning text, images and bulky tool payloads are
+stripped before summarizing, and the summary is prepended to the window as one system message, so the prompt stays
+bounded by the context budget plus COMPACTION_SUMMARY_TOKENS however long the session runs. The summary belongs to
+the history it covers: a history that does not start with that prefix (another conversation, e.g. one query of
+Agent.ask_many) is sent without it.
+"""
+import json
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from src.agents_utils.context_window import ContextWindow, shares_prefix
+from src.config import settings
+from src.llm_chats import client_pool
+from src.utils import async_runner, token_count
+from src.utils.logging_config import get_logger
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+COMPACTION_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new turns into the current summary. Keep facts, names, numbers, decisions, user preferences "
+    "and open questions; drop greetings, reasoning and verbatim tool output. "
+    "Answer with the updated summary only, at most {words} words."
+)
+_REASONING = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+
+def strip_reasoning(text: str) -> str:
+    """Remove <think>...</think> blocks some models emit inline."""
+    return _REASONING.sub("", text).strip()
+
+
+def _clip(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} chars truncated]"
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and part.get("type") == "text":
+                parts.append(part.get("text", ""))
+            elif isinstance(part, dict) and part.get("type") == "image_url":
+                parts.append("[image]")
+        return " ".join(parts)
+    return str(content or "")
+
+
+def render(message: Any) -> str:
+    """
+    One transcript line of a message without reasoning, images or bulky tool payloads
+    :param message: dict, (role, content) tuple or BaseMessage
+    :return: "role: text"
+    """
+    if isinstance(message, dict):
+        role, content, tool_calls = message.get("role", ""), message.get("content"), message.get("tool_calls")
+    elif isinstance(message, tuple):
+        (role, content), tool_calls = message, None
+    else:
+        role, content, tool_calls = message.type, message.content, getattr(message, "tool_calls", None)
+    text = strip_reasoning(_text(content))
+    if role == "tool":
+        text = _clip(text, settings.COMPACTION_TOOL_CHARS)
+    for call in tool_calls or []:
+        name = call.get("name") or call.get("function", {}).get("name")
+        args = call.get("args") or call.get("function", {}).get("arguments", "")
+        args = args if isinstance(args, str) else json.dumps(args, ensure_ascii=False)
+        text += f" [called {name}({_clip(args, settings.COMPACTION_TOOL_CHARS)})]"
+    return f"{role}: {text.strip()}"
+
+
+class Compactor:
+
+    def __init__(self, context: ContextWindow, model: Optional[str] = None):
+        """
+        Running summary of the turns evicted from a context window
+        :param context: window of the Agent/Chatbot
+        :param model: summarizing model, defaults to settings.COMPACTION_MODEL or BACKUP_MODEL_NAME
+        """
+        self.context = context
+        self.model = model or settings.COMPACTION_MODEL or settings.BACKUP_MODEL_NAME
+        self.summary = ""
+        self.covered = 0  # leading history messages folded into the summary
+        self._covered_messages: list = []  # the history prefix the summary covers
+        self.stats = {"runs": 0, "failures": 0, "messages_folded": 0, "tokens_folded": 0}
+        self._generation = 0
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def window(self, messages: list) -> list:
+        """
+        Context window of a history with the running summary prepended
+        :param messages: full history, oldest first
+        :return: messages to send
+        """
+        window = self.context.select(messages)
+        with self._lock:
+            summary = self.summary if self._continues(messages) else ""
+        if not summary:
+            return window
+        return [{"role": "system", "content": SUMMARY_PREFIX + summary}] + window
+
+    def schedule(self, messages: list) -> Optional[Future]:
+        """
+        Fold the evicted part of a history into the summary in the background once it crosses the threshold
+        :param messages: full history after the latest answer
+        :return: future of the background run, None if nothing was scheduled
+        """
+        if not settings.COMPACTION:
+            return None
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return None
+            same = self._continues(messages)
+            covered, summary = (self.covered, self.summary) if same else (0, "")
+            end = self.context.start(messages)
+            pending = list(messages[covered:end])
+            tokens = sum(self.context.tokens(messages)[covered:end])
+            if not pending or tokens < settings.COMPACTION_TRIGGER_TOKENS:
+                return None
+            if not same:
+                # the summary of another conversation only gives way once this one needs its own
+                self._reset()
+            fold = self._fold(pending, tokens, end, list(messages[:end]), summary, self._generation)
+            self._future = async_runner.submit(fold)
+            return self._future
+
+    def _continues(self, messages: list) -> bool:
+        """Whether a history extends the one the summary covers (called under the lock)."""
+        return shares_prefix(messages, self._covered_messages)
+
+    async def _fold(self, pending: list, tokens: int, end: int, covered: list, summary: str, generation: int) -> None:
+        words = settings.COMPACTION_SUMMARY_TOKENS * 3 // 4
+        transcript = "\n".join(render(m) for m in pending)
+        prompt = [
+            {"role": "system", "content": COMPACTION_PROMPT.format(words=words)},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ]
+        try:
+            response = await client_pool.get_chat_model(self.model, temperature=0).ainvoke(prompt)
+        except Exception as e:
+            self.stats["failures"] += 1
+            get_logger().warning(f"Conversation compaction failed: {e}")
+            return
+        limit = settings.COMPACTION_SUMMARY_TOKENS * token_count.CHARS_PER_TOKEN
+        new_summary = _clip(strip_reasoning(_text(response.content)), limit)
+        with self._lock:
+            if generation != self._generation or not new_summary:
+                return
+            self.summary, self.covered, self._covered_messages = new_summary, end, covered
+            self.stats["runs"] += 1
+            self.stats["messages_folded"] += len(pending)
+            self.stats["tokens_folded"] += tokens
+        get_logger().info(
+            f"Compacted {len(pending)} messages (~{tokens} tokens) into a summary of "
+            f"~{token_count.count_text(new_summary)} tokens"
+        )
+
+    def _reset(self) -> None:
+        self.summary, self.covered, self._future = "", 0, None
+        self._covered_messages = []
+        self._generation += 1
+
+    def reset(self) -> None:
+        """Forget the summary, e.g. when the conversation is cleared."""
+        with self._lock:
+            self._reset()
@@ -0,0 +1,178 @@
+"""
+Token-budgeted history window.
+
+Fills a token budget with the newest messages first instead of keeping a fixed number of messages, so one pasted
+PDF cannot blow up the prompt while many short turns still fit. Token counts are estimated locally, once per message
+of the conversation the window last saw (kept on the window, so they go with the session; the caller's messages are
+never modified), an AI message with tool calls is kept or dropped together with its tool results, and the
+decision of the last selection is kept in ``last_trim`` for debugging. The window start only moves when the history
+overflows, and then by a whole step, so consecutive turns share their prompt prefix (provider prompt caching); it is
+only reused while the incoming history extends the one the window last saw, which is checked message by message
+against the kept history (by identity first, so an unchanged history is not re-read).
+"""
+import sys
+from typing import Any, Optional
+
+
+from src.config import settings
+from src.utils import token_count
+from src.utils.logging_config import get_logger
+
+def _role(message: Any) -> str:
+    if isinstance(message, dict):
+        return message.get("role", "")
+    return getattr(message, "type", "")
+
+
+def _tool_calls(message: Any) -> list:
+    if isinstance(message, dict):
+        return message.get("tool_calls") or []
+    return getattr(message, "tool_calls", None) or []
+
+
+def _content(message: Any) -> Any:
+    if isinstance(message, dict):
+        return message.get("content")
+    return getattr(message, "content", message)
+
+
+def _same(message: Any, other: Any) -> bool:
+    """Whether two stored messages are the same turn: the same object, or equal roles, contents and tool calls."""
+    if message is other:
+        return True
+    return (_role(message), _content(message), _tool_calls(message)) == (_role(other), _content(other), _tool_calls(other))
+
+
+def shares_prefix(messages: list, prefix: list) -> bool:
+    """Whether a history starts with the given messages (see _same), e.g. the part a summary covers."""
+    return len(messages) >= len(prefix) and all(_same(m, p) for m, p in zip(messages, prefix))
+
+
+def group_messages(messages: list) -> list[list]:
+    """
+    Split a history into units that must not be separated: an AI message with tool calls plus its tool results
+    :param messages: history, oldest first
+    :return: groups, oldest first
+    """
+    groups: list[list] = []
+    open_group: Optional[list] = None
+    for message in messages:
+        if _role(message) == "tool" and open_group is not None:
+            open_group.append(message)
+            continue
+        group = [message]
+        groups.append(group)
+        open_group = group if _role(message) in ("ai", "assistant") and _tool_calls(message) else None
+    return groups
+
+
+class ContextWindow:
+
+    def __init__(self, budget: int, max_messages: Optional[int] = None, trim_ratio: Optional[float] = None):
+        """
+        Create a history window
+        :param budget: token budget of the history (system prompt and tool schemas not included)
+        :param max_messages: optional hard cap on the number of messages
+        :param trim_ratio: share of the limits kept when the window overflows, defaults to settings.CONTEXT_TRIM_RATIO;
+        the window start stays fixed until the next overflow, so the prompt prefix is stable between trims
+        """
+        self.budget = budget
+        self.max_messages = max_messages
+        self.trim_ratio = settings.CONTEXT_TRIM_RATIO if trim_ratio is None else trim_ratio
+        self.last_trim: dict = {}
+        self._tracked: list = []  # the history seen last, oldest first
+        self._counts: list[int] = []  # its estimated tokens per message
+        self._anchor = 0  # start of the window in the kept history
+
+    @staticmethod
+    def _fits(groups: list[list], group_tokens: list[int], budget: float,
+              max_messages: Optional[int]) -> tuple[list[list], int]:
+        """Newest groups that fit the given limits and their tokens, newest first."""
+        kept: list[list] = []
+        used = 0
+        count = 0
+        for group, tokens in zip(reversed(groups), reversed(group_tokens)):
+            over_budget = used + tokens > budget
+            over_count = max_messages is not None and count + len(group) > max_messages
+            if kept and (over_budget or over_count):
+                break
+            kept.append(group)
+            used += tokens
+            count += len(group)
+        return kept, used
+
+    def tokens(self, messages: list) -> list[int]:
+        """
+        Estimated tokens of every message of a history; counts of the messages the window has seen are reused
+        :param messages: full history, oldest first
+        :return: token counts, aligned with messages
+        """
+        seen = 0
+        limit = min(len(messages), len(self._tracked))
+        while seen < limit and _same(messages[seen], self._tracked[seen]):
+            self._tracked[seen] = messages[seen]
+            seen += 1
+        # another conversation, or this one was edited: only the shared prefix keeps its counts
+        del self._tracked[seen:], self._counts[seen:]
+        if seen < self._anchor:
+            self._anchor = 0
+        for message in messages[seen:]:
+            self._tracked.append(message)
+            self._counts.append(token_count.count_message(message))
+        return list(self._counts)
+
+    def _fit(self, messages: list) -> tuple[list[list], int, int, int]:
+        """Kept groups (newest first), their tokens, the index of the oldest kept message and the history's tokens."""
+        counts = self.tokens(messages)
+        anchor = self._anchor  # 0 unless messages extend the history the anchor was set on
+        groups = group_messages(messages[anchor:])
+        group_tokens, index = [], anchor
+        for group in groups:
+            group_tokens.append(sum(counts[index:index + len(group)]))
+            index += len(group)
+        kept, used = self._fits(groups, group_tokens, self.budget, self.max_messages)
+        if len(kept) < len(groups):
+            # overflow: trim in one step below the limits, the following turns then share the new prefix
+            max_messages = None if self.max_messages is None else max(1, int(self.max_messages * self.trim_ratio))
+            kept, used = self._fits(groups, group_tokens, self.budget * self.trim_ratio, max_messages)
+        return kept, used, len(messages) - sum(len(group) for group in kept), sum(counts)
+
+    def start(self, messages: list) -> int:
+        """Index of the oldest message that select() would keep."""
+        return self._fit(messages)[2]
+
+    def reset(self) -> None:
+        """Forget the window start and the token counts, e.g. when the conversation is replaced."""
+        self._anchor, self._tracked, self._counts = 0, [], []
+
+    def select(self, messages: list) -> list:
+        """
+        Newest messages that fit the budget; the newest unit is always kept, even when it alone exceeds it
+        :param messages: full history, oldest first
+        :return: window to send, oldest first
+        """
+        kept, used, self._anchor, total = self._fit(messages)
+        window = [m for group in reversed(kept) for m in group]
+        self.last_trim = {
+            "budget": self.budget,
+            "used_tokens": used,
+            "kept_messages": len(window),
+            "dropped_messages": len(messages) - len(window),
+            "dropped_tokens": total - used,
+        }
+        if self.last_trim["dropped_messages"]:
+            get_logger().debug(f"Context window trimmed: {self.last_trim}")
+        return window
+
+
+def create(chat_history_limit: int, budget: Optional[int] = None) -> ContextWindow:
+    """
+    Window of an Agent/Chatbot
+    :param chat_history_limit: message limit, only used when the token budget is 0
+    :param budget: token budget, defaults to settings.CONTEXT_TOKEN_BUDGET
+    :return: context window
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+    if budget > 0:
+        return ContextWindow(budget)
+    return ContextWindow(sys.maxsize, max_messages=chat_history_limit)
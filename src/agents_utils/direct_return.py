@@ -0,0 +1,109 @@
+"""
+Direct-return tools.
+
+Some tools already produce the final answer (calculate, get_time, world_clock_dashboard, the weather reports), and
+sending their output back to the model only to have it restated doubles the latency and the tokens of a turn. A tool
+marked direct-return ends the agent turn as soon as it finishes (LangChain's ``return_direct``: the graph exits when
+every tool call of the model turn was direct-return) and its output, optionally formatted with a local template,
+becomes the answer. A failed direct-return call goes back to the model as usual.
+
+Tools are marked where they are registered with ``mark(tool, template=...)``; tools loaded elsewhere (e.g. from MCP
+servers) are marked by name from settings.TOOL_RETURN_DIRECT. Templates are ``str.format`` strings over the call
+arguments and ``{result}``.
+"""
+from typing import Any, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langgraph.types import Command
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+_TEMPLATE = "direct_template"
+
+
+def mark(tool: Any, template: Optional[str] = None) -> Any:
+    """
+    Mark a tool as direct-return
+    :param tool: BaseTool
+    :param template: optional format string over the call arguments and {result}
+    :return: the same tool, for chaining
+    """
+    tool.return_direct = True
+    if template is not None:
+        tool.metadata = {**(tool.metadata or {}), _TEMPLATE: template}
+    return tool
+
+
+def apply_settings(tools: list) -> list:
+    """Mark the tools named in settings.TOOL_RETURN_DIRECT (tools are shared, the marking is process-wide)."""
+    for tool in tools:
+        name = getattr(tool, "name", None)
+        if name in settings.TOOL_RETURN_DIRECT and not getattr(tool, "return_direct", False):
+            mark(tool, settings.TOOL_RETURN_DIRECT[name])
+    return tools
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "\n".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return str(content)
+
+
+def render(template: str, args: dict, result: Any) -> str:
+    """Format a direct-return result, falling back to the plain result if the template does not fit the call."""
+    try:
+        return template.format(**args, result=_text(result))
+    except (KeyError, IndexError, ValueError) as e:
+        get_logger().warning(f"Direct-return template {template!r} failed: {e}")
+        return _text(result)
+
+
+def final_answer(messages: list[BaseMessage]) -> str:
+    """
+    Answer of a finished agent run: the last AI message, or the outputs of the direct-return tool calls it ended with
+    :param messages: messages of the final graph state
+    :return: answer text
+    """
+    if not messages:
+        return ""
+    if not isinstance(messages[-1], ToolMessage):
+        return messages[-1].content
+    results = {}
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            calls = message.tool_calls if isinstance(message, AIMessage) else []
+            return "\n\n".join(_text(results[c["id"]]) for c in calls if c["id"] in results)
+        results[message.tool_call_id] = message.content
+    return "\n\n".join(_text(c) for c in reversed(results.values()))
+
+
+def failed(result: ToolMessage) -> bool:
+    """Whether a tool result is an error (status, or the "Error ..." text the MCP tools return)."""
+    return result.status == "error" or _text(result.content).lstrip().lower().startswith("error")
+
+
+class DirectReturnMiddleware(AgentMiddleware):
+    """
+    Agent middleware for direct-return tools: formats their output with its template, and hands a failed call back
+    to the model (instead of ending the turn on an error) so it can correct the arguments or answer otherwise.
+    """
+
+    @staticmethod
+    def _format(request: ToolCallRequest, result: Any) -> Any:
+        if not getattr(request.tool, "return_direct", False) or not isinstance(result, ToolMessage):
+            return result
+        if failed(result):
+            return Command(update={"messages": [result]}, goto="model")
+        template = (getattr(request.tool, "metadata", None) or {}).get(_TEMPLATE)
+        if template is None:
+            return result
+        content = render(template, request.tool_call.get("args") or {}, result.content)
+        return result.model_copy(update={"content": content})
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        return self._format(request, handler(request))
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        return self._format(request, await handler(request))
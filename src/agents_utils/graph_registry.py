@@ -0,0 +1,69 @@
+"""
+Process-wide registry of compiled agent graphs.
+
+Streamlit creates a new App/Agent for every browser session, and compiling the create_agent graph (with its tool
+binding and middleware) was repeated for identical configurations. Graphs are stateless here: the conversation is
+passed in on every invocation and no checkpointer is attached, so sessions with the same (model client, tool set,
+tool pruning and dispatch settings) share one compiled graph while their histories, context windows and summaries
+stay on their own Agent. The system prompt is part of every request, not of the graph, so bots with different
+prompts share graphs too. At most GRAPH_REGISTRY_ITEMS graphs are kept, the least recently used is evicted first.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+_lock = threading.Lock()
+_graphs: OrderedDict[tuple, "CompiledAgent"] = OrderedDict()
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+class CompiledAgent(NamedTuple):
+    graph: Any
+    tool_pruning: Optional[Any]  # the graph's ToolPruningMiddleware, shared by its sessions
+    dispatch: Optional[Any]  # the graph's StreamingDispatchMiddleware in streaming tool dispatch
+    tools: tuple  # kept referenced, so the ids in the key stay unique
+
+
+def graph_key(llm: Any, tools: list, *options: Any) -> tuple:
+    """
+    Registry key of an agent configuration
+    :param llm: pooled chat client, which stands for the model and its generation settings
+    :param tools: bound tools, by identity (two tools with the same name may differ in behaviour)
+    :param options: further settings the graph is built with, e.g. tool pruning
+    :return: hashable key
+    """
+    return (id(llm), tuple((getattr(t, "name", ""), id(t)) for t in tools)) + options
+
+
+def get_or_create(key: tuple, factory: Callable[[], CompiledAgent]) -> CompiledAgent:
+    """
+    Return the compiled agent of a key, building it once with factory() if missing
+    :param key: output of graph_key()
+    :param factory: builds the CompiledAgent
+    :return: shared compiled agent (do not mutate)
+    """
+    with _lock:
+        compiled = _graphs.get(key)
+        if compiled is not None:
+            _graphs.move_to_end(key)
+            stats["hits"] += 1
+            return compiled
+        # compiling under the lock keeps concurrent first sessions from building the same graph twice
+        compiled = factory()
+        _graphs[key] = compiled
+        stats["misses"] += 1
+        # sessions that hold an evicted graph keep using it, it is only no longer shared with new ones
+        while len(_graphs) > settings.GRAPH_REGISTRY_ITEMS:
+            _graphs.popitem(last=False)
+            stats["evictions"] += 1
+    get_logger().info(f"Agent graph compiled ({len(_graphs)} in registry)")
+    return compiled
+
+
+def clear() -> None:
+    """Drop every registered graph."""
+    with _lock:
+        _graphs.clear()
@@ -0,0 +1,77 @@
+"""
+Local router in front of App.ask.
+
+Small talk does not need the ReAct graph with every tool schema on MODEL_NAME. The router decides per turn, on the
+CPU and in well under a millisecond, whether a query takes the "light" path (one tool-less call on BACKUP_MODEL_NAME)
+or the "full" agent path. Only queries that are small talk as a whole (greetings, thanks, goodbyes, "how are you?")
+take the light path; anything else, however short, takes the full path, as a wrong light answer costs more than the
+agent's latency. Replies such as "yes" or "sure" answer the previous turn and need its tools, so they are not small
+talk.
+
+Decisions, their reasons and the latency of both paths are logged and kept in ``stats``.
+"""
+import re
+import threading
+from typing import Literal, NamedTuple
+
+from src.utils.logging_config import get_logger
+
+Route = Literal["light", "full"]
+
+_SMALL_TALK_PHRASE = (
+    r"(?:hi|hello|hey|hiya|yo|thanks|thank you|thx|ty|ok|okay|cool|great|nice|awesome|perfect|bye|goodbye|see you|"
+    r"good (?:morning|afternoon|evening|night)|how are you|who are you|what can you do|lol)"
+    r"(?: there| again| so much| a lot| very much)?"
+)
+# one or more phrases and nothing else, e.g. "Hi there!" or "ok, thanks"
+_SMALL_TALK = re.compile(rf"(?:{_SMALL_TALK_PHRASE}(?:[\s!.?,:)]+|$))+", re.IGNORECASE)
+
+
+class Decision(NamedTuple):
+    route: Route
+    reason: str
+
+
+class QueryRouter:
+
+    def __init__(self):
+        """Create a router for a bot"""
+        self._lock = threading.Lock()
+        self.stats = {"light": 0, "full": 0, "escalated": 0, "light_seconds": 0.0, "full_seconds": 0.0,
+                      "estimated_seconds_saved": 0.0}
+
+    @staticmethod
+    def decide(query: str) -> Decision:
+        """
+        Route of a query
+        :param query: user query
+        :return: route and the reason behind it
+        """
+        text = query.strip()
+        if not text:
+            return Decision("light", "empty")
+        if _SMALL_TALK.fullmatch(text):
+            return Decision("light", "small talk")
+        return Decision("full", "not small talk")
+
+    def record(self, decision: Decision, seconds: float, escalated: bool = False) -> None:
+        """
+        Log a routed turn and its latency against the average of the full path
+        :param decision: decision taken
+        :param seconds: latency of the turn
+        :param escalated: the light path failed and the turn was answered by the full path
+        """
+        route = "full" if escalated else decision.route
+        with self._lock:
+            self.stats[route] += 1
+            self.stats[f"{route}_seconds"] += seconds
+            self.stats["escalated"] += escalated
+            full_average = self.stats["full_seconds"] / self.stats["full"] if self.stats["full"] else None
+            saved = None
+            if route == "light" and full_average is not None:
+                saved = full_average - seconds
+                self.stats["estimated_seconds_saved"] += saved
+        message = f"Router: {route} path ({decision.reason}{', escalated' if escalated else ''}) in {seconds:.2f}s"
+        if saved is not None:
+            message += f", ~{saved:.2f}s faster than the full path average"
+        get_logger().info(message)
@@ -0,0 +1,187 @@
+"""
+End-to-end deadline and iteration budget of one agent request.
+
+A single turn can chain several model calls (each up to TIMEOUT with retries), tool calls, Selenium page loads and OCR.
+``Agent`` opens a ``RequestBudget`` for every request with ``scope(deadline, max_iterations)``; it is carried in a
+context variable, so everything that runs for the request sees it:
+
+* ``BudgetMiddleware`` counts the model calls, passes the remaining time to Groq as the request timeout and makes the
+  last affordable call (out of iterations, or less than REQUEST_ANSWER_RESERVE seconds left) answer without calling
+  tools. When nothing is left it answers locally with ``partial_answer``: the model's last text and the tool results
+  gathered so far.
+* ``ToolExecutionMiddleware`` clips every tool timeout to the remaining time (``clip``) and skips tools once the
+  deadline has passed; heavy local tools can check ``current()`` themselves and stop early.
+
+The budget of a bot comes from settings.REQUEST_BUDGETS by its name, then REQUEST_DEADLINE and
+REQUEST_MAX_ITERATIONS. A limit of 0 (or None) disables it.
+"""
+import asyncio
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agents_utils import compaction, direct_return
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+_current: ContextVar[Optional["RequestBudget"]] = ContextVar("request_budget", default=None)
+stats = {"requests": 0, "exhausted": 0, "final_calls": 0}
+
+
+class RequestBudget:
+    __slots__ = ("deadline", "max_iterations", "iterations", "exhausted")
+
+    def __init__(self, seconds: Optional[float] = None, max_iterations: Optional[int] = None):
+        """
+        Time and model-call budget of one request
+        :param seconds: wall-clock seconds from now, None for no deadline
+        :param max_iterations: model calls allowed, None for no limit
+        """
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.max_iterations = max_iterations or None
+        self.iterations = 0
+        self.exhausted = False  # the answer was cut short by the budget
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, None without a deadline."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def clip(self, timeout: Optional[float]) -> Optional[float]:
+        """The smaller of a timeout and the remaining time (None is unbounded)."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def last_call(self) -> bool:
+        """Whether the next model call must answer, as there is no budget for another tool round."""
+        if self.max_iterations is not None and self.iterations + 1 >= self.max_iterations:
+            return True
+        remaining = self.remaining()
+        return remaining is not None and remaining <= settings.REQUEST_ANSWER_RESERVE
+
+
+def budget_of(name: Optional[str], deadline: Optional[float] = None,
+              max_iterations: Optional[int] = None) -> tuple[Optional[float], Optional[int]]:
+    """
+    Effective budget of a bot: the given values, then settings.REQUEST_BUDGETS by name, then the defaults
+    :param name: bot name (its cache namespace), if any
+    :param deadline: seconds per request
+    :param max_iterations: model calls per request
+    :return: deadline and max iterations, None when unlimited
+    """
+    declared = settings.REQUEST_BUDGETS.get(name, {}) if name else {}
+    if deadline is None:
+        deadline = declared.get("deadline", settings.REQUEST_DEADLINE)
+    if max_iterations is None:
+        max_iterations = declared.get("max_iterations", settings.REQUEST_MAX_ITERATIONS)
+    return deadline or None, max_iterations or None
+
+
+def current() -> Optional[RequestBudget]:
+    """Budget of the running request, None outside of one."""
+    return _current.get()
+
+
+def clip(timeout: Optional[float]) -> Optional[float]:
+    """A timeout clipped to the remaining time of the running request."""
+    budget = _current.get()
+    return timeout if budget is None else budget.clip(timeout)
+
+
+@contextlib.contextmanager
+def scope(seconds: Optional[float], max_iterations: Optional[int]) -> Iterator[RequestBudget]:
+    """Run a request under a new budget."""
+    budget = RequestBudget(seconds, max_iterations)
+    token = _current.set(budget)
+    stats["requests"] += 1
+    try:
+        yield budget
+    finally:
+        if budget.exhausted:
+            stats["exhausted"] += 1
+        try:
+            _current.reset(token)
+        except ValueError:
+            # an abandoned stream is closed from another context, which never saw the budget
+            pass
+
+
+def partial_answer(messages: list) -> str:
+    """
+    Best answer without another model call: the model's last text of the request and its successful tool results
+    :param messages: messages of the running graph state
+    :return: answer text
+    """
+    start = max((i + 1 for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    notes, results = [], []
+    for message in messages[start:]:
+        if isinstance(message, AIMessage):
+            text = compaction.strip_reasoning(compaction._text(message.content))
+            if text:
+                notes = [text]
+        elif isinstance(message, ToolMessage) and not direct_return.failed(message):
+            text = compaction._clip(compaction._text(message.content), settings.REQUEST_PARTIAL_TOOL_CHARS)
+            results.append(f"{message.name}: {text}")
+    return "\n\n".join([settings.REQUEST_BUDGET_NOTICE] + notes + results)
+
+
+class BudgetMiddleware(AgentMiddleware):
+    """Agent middleware that enforces the request budget on every model call."""
+
+    @staticmethod
+    def _prepare(request: ModelRequest) -> tuple[Optional[RequestBudget], Optional[ModelRequest]]:
+        """The budget and the request to send, None when the budget is spent and the answer must be local."""
+        budget = _current.get()
+        if budget is None:
+            return None, request
+        if budget.expired() or (budget.max_iterations is not None and budget.iterations >= budget.max_iterations):
+            return budget, None
+        if budget.last_call():
+            # same tools as before, so the prompt prefix stays cached, but no more tool rounds
+            request = request.override(tool_choice="none")
+            stats["final_calls"] += 1
+            budget.exhausted = budget.exhausted or budget.iterations > 0
+        budget.iterations += 1
+        remaining = budget.remaining()
+        if remaining is not None:
+            request = request.override(model_settings={**request.model_settings, "timeout": remaining})
+        return budget, request
+
+    @staticmethod
+    def _local_answer(budget: RequestBudget, request: ModelRequest, reason: str) -> ModelResponse:
+        budget.exhausted = True
+        get_logger().warning(f"Request budget exhausted ({reason}) after {budget.iterations} model calls")
+        return ModelResponse(result=[AIMessage(content=partial_answer(request.messages))])
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable) -> Any:
+        budget, prepared = self._prepare(request)
+        if prepared is None:
+            return self._local_answer(budget, request, "no time or iterations left")
+        try:
+            return handler(prepared)
+        except Exception:
+            if budget is None or not budget.expired():
+                raise
+            return self._local_answer(budget, request, "model call timed out")
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable) -> Any:
+        budget, prepared = self._prepare(request)
+        if prepared is None:
+            return self._local_answer(budget, request, "no time or iterations left")
+        if budget is None or budget.deadline is None:
+            return await handler(prepared)
+        try:
+            # the client timeout bounds each attempt, this bounds the retries too
+            return await asyncio.wait_for(handler(prepared), budget.remaining())
+        except Exception:
+            if not budget.expired():
+                raise
+            return self._local_answer(budget, request, "model call timed out")
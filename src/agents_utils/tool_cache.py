@@ -0,0 +1,221 @@
+"""
+Memoizing cache for agent tool calls.
+
+Agents often repeat a tool call with the same arguments within a conversation, or even twice in one turn
+(wikipedia_search, calculate, get_current_weather, Tavily search). ``ToolCacheMiddleware`` keys every call on
+(tool name, canonical JSON of the arguments) and serves repeats from a process-wide in-memory LRU; identical calls
+that are still running are coalesced into one execution, the others wait for its result. An execution whose caller is
+cancelled (e.g. an unused early start of streaming dispatch) is abandoned rather than shared: its waiters, possibly
+from other sessions, claim the call again and one of them runs the tool.
+
+How long a result stays valid is a per-tool policy from settings.TOOL_CACHE_TTLS: None keeps it forever (pure
+functions such as calculate), a number of seconds expires it (weather, search) and 0 never caches it (get_time).
+Tools without a policy use TOOL_CACHE_DEFAULT_TTL. Only successful results are cached: neither error ToolMessages
+nor the "Error ..." texts the MCP tools return.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+
+from src.agents_utils import direct_return
+from src.config import settings
+
+_MISSING = object()
+_ABANDONED = object()  # outcome of an execution whose caller was cancelled
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def make_key(name: str, args: Any) -> tuple[str, str]:
+    """Cache key of a tool call: its name and canonical JSON arguments (sorted keys, stripped strings)."""
+    return name, json.dumps(_canonical(args), sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def ttl_of(name: str) -> Optional[float]:
+    """TTL policy of a tool: None caches forever, 0 disables caching."""
+    return settings.TOOL_CACHE_TTLS.get(name, settings.TOOL_CACHE_DEFAULT_TTL)
+
+
+class ToolResultCache:
+
+    def __init__(self, max_items: int = 1024):
+        """
+        In-memory LRU of tool results with in-flight coalescing
+        :param max_items: maximum number of cached results
+        """
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple, tuple[Optional[float], Any]] = OrderedDict()
+        self._in_flight: dict[tuple, Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "expired": 0, "evictions": 0,
+                      "abandoned": 0}
+
+    def get(self, key: tuple) -> Any:
+        """Cached result of a key, or _MISSING."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISSING
+            expires, result = item
+            if expires is not None and expires <= time.monotonic():
+                del self._items[key]
+                self.stats["expired"] += 1
+                return _MISSING
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return result
+
+    def claim(self, key: tuple) -> tuple[Future, bool]:
+        """
+        Future of the running execution of a key
+        :return: the future and whether the caller owns it (and must run the tool and resolve it)
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = self._in_flight[key] = Future()
+            self.stats["misses"] += 1
+            return future, True
+
+    def _release(self, key: tuple, future: Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    def resolve(self, key: tuple, future: Future, result: Any, ttl: Optional[float], error: Optional[BaseException]):
+        """Finish an owned execution: cache a successful result and wake the coalesced callers."""
+        with self._lock:
+            self._release(key, future)
+            if error is None and ttl != 0 and _succeeded(result):
+                self._items[key] = (None if ttl is None else time.monotonic() + ttl, result)
+                self._items.move_to_end(key)
+                self.stats["stores"] += 1
+                while len(self._items) > self.max_items:
+                    self._items.popitem(last=False)
+                    self.stats["evictions"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def abandon(self, key: tuple, future: Future) -> None:
+        """Give up an owned execution whose caller was cancelled; the coalesced callers claim the call again."""
+        with self._lock:
+            self._release(key, future)
+            self.stats["abandoned"] += 1
+        future.set_result(_ABANDONED)
+
+    def hit_rate(self) -> float:
+        """Share of calls answered from the cache or by a coalesced execution."""
+        with self._lock:
+            served = self.stats["hits"] + self.stats["coalesced"]
+            total = served + self.stats["misses"]
+            return served / total if total else 0.0
+
+    def clear(self) -> None:
+        """Drop every cached result (running executions are not affected)."""
+        with self._lock:
+            self._items.clear()
+
+
+def _succeeded(result: Any) -> bool:
+    # MCP tools report failures as "Error ..." text with a success status, those must not be served for a whole TTL
+    return isinstance(result, ToolMessage) and not direct_return.failed(result)
+
+
+def _for_call(result: ToolMessage, request: ToolCallRequest) -> ToolMessage:
+    """A cached or shared ToolMessage answering this call's id."""
+    return result.model_copy(update={"tool_call_id": request.tool_call["id"], "id": None})
+
+
+_cache: Optional[ToolResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ToolResultCache:
+    """Return the process-wide tool result cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache(settings.TOOL_CACHE_ITEMS)
+        return _cache
+
+
+class ToolCacheMiddleware(AgentMiddleware):
+    """Agent middleware that memoizes tool results by (tool name, canonical arguments)."""
+
+    def _lookup(self, request: ToolCallRequest) -> tuple[Optional[tuple], Optional[float], Any]:
+        name = request.tool_call["name"]
+        ttl = ttl_of(name)
+        if ttl == 0:
+            return None, ttl, _MISSING
+        key = make_key(name, request.tool_call.get("args", {}))
+        return key, ttl, get_cache().get(key)
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        key, ttl, cached = self._lookup(request)
+        if key is None:
+            return handler(request)
+        while True:
+            if cached is not _MISSING:
+                return _for_call(cached, request)
+            future, owner = get_cache().claim(key)
+            if owner:
+                break
+            result = future.result()
+            if result is not _ABANDONED:
+                return _for_call(result, request) if isinstance(result, ToolMessage) else result
+            cached = get_cache().get(key)
+        try:
+            result = handler(request)
+        except Exception as e:
+            get_cache().resolve(key, future, None, ttl, e)
+            raise
+        except BaseException:
+            get_cache().abandon(key, future)
+            raise
+        get_cache().resolve(key, future, result, ttl, None)
+        return result
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        key, ttl, cached = self._lookup(request)
+        if key is None:
+            return await handler(request)
+        while True:
+            if cached is not _MISSING:
+                return _for_call(cached, request)
+            future, owner = get_cache().claim(key)
+            if owner:
+                break
+            # shielded: cancelling one waiter must not cancel the shared future of the others
+            result = await asyncio.shield(asyncio.wrap_future(future))
+            if result is not _ABANDONED:
+                return _for_call(result, request) if isinstance(result, ToolMessage) else result
+            cached = get_cache().get(key)
+        try:
+            result = await handler(request)
+        except Exception as e:
+            get_cache().resolve(key, future, None, ttl, e)
+            raise
+        except BaseException:
+            # cancelled (or interrupted): the waiters must not inherit it
+            get_cache().abandon(key, future)
+            raise
+        get_cache().resolve(key, future, result, ttl, None)
+        return result
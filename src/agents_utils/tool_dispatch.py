@@ -0,0 +1,191 @@
+"""
+Streaming tool dispatch.
+
+The graph's tool node starts only after the whole AI message was generated, although the model streams its tool calls
+one by one. In streaming dispatch a ``ToolDispatcher`` is attached to the run as a callback: it assembles the tool
+call chunks of the streamed model output and starts each call the moment its JSON arguments are complete, so tool I/O
+(weather, Tavily, Wikipedia) overlaps with the rest of the generation. When the tool node reaches the call,
+``StreamingDispatchMiddleware`` hands it the result of the early start instead of running the tool again.
+
+The results are those of the normal path: an early call runs through the same tool middleware (cache, retries,
+execution limits, direct-return formatting) and only when its final arguments match. Calls that are not safe to start
+early (unknown tools, tools with injected arguments, arguments that do not validate) are left to the tool node, and so
+is a call whose early run raised. Early starts the model did not end up making are cancelled when the run finishes.
+"""
+import asyncio
+import contextlib
+import json
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+from uuid import UUID
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ToolCallRequest
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import ToolMessage
+from langgraph.prebuilt.tool_node import msg_content_output
+
+from src.utils.logging_config import get_logger
+
+_current: ContextVar[Optional["ToolDispatcher"]] = ContextVar("tool_dispatcher", default=None)
+stats = {"dispatched": 0, "used": 0, "wasted": 0, "fallbacks": 0}
+
+
+def _has_injected_args(tool: Any) -> bool:
+    """Whether a tool takes arguments the model does not provide (state, runtime, ...), which only the node injects."""
+    schema = tool.tool_call_schema
+    visible = schema.get("properties", {}) if isinstance(schema, dict) else schema.model_fields
+    return bool(set(tool.args) - set(visible))
+
+
+def _valid_args(tool: Any, args: dict) -> bool:
+    schema = tool.args_schema
+    if schema is None or isinstance(schema, dict):
+        return True
+    try:
+        schema.model_validate(args)
+        return True
+    except Exception:
+        return False
+
+
+class ToolDispatcher(AsyncCallbackHandler):
+
+    def __init__(self, execute: Callable, tools: dict):
+        """
+        Starts the tool calls of one agent run as they are streamed
+        :param execute: coroutine function running a tool call through the tool middleware
+        :param tools: tools that may be started early, by name
+        """
+        self._execute = execute
+        self._tools = tools
+        self._buffers: dict[tuple[UUID, int], dict] = {}
+        self._started: dict[str, tuple[dict, asyncio.Task]] = {}
+
+    async def on_llm_new_token(self, token: str, *, chunk: Any = None, run_id: UUID, **kwargs: Any) -> None:
+        for part in getattr(getattr(chunk, "message", None), "tool_call_chunks", None) or ():
+            buffer = self._buffers.setdefault((run_id, part.get("index") or 0), {"id": None, "name": None, "args": ""})
+            buffer["id"] = buffer["id"] or part.get("id")
+            buffer["name"] = buffer["name"] or part.get("name")
+            buffer["args"] += part.get("args") or ""
+            self._start(buffer)
+
+    async def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        for key in [k for k in self._buffers if k[0] == run_id]:
+            del self._buffers[key]
+
+    def _start(self, buffer: dict) -> None:
+        call_id, tool = buffer["id"], self._tools.get(buffer["name"])
+        if not call_id or tool is None or call_id in self._started or not buffer["args"]:
+            return
+        try:
+            args = json.loads(buffer["args"])
+        except ValueError:
+            return  # not complete yet
+        if not isinstance(args, dict) or not _valid_args(tool, args):
+            return
+        call = {"name": buffer["name"], "args": args, "id": call_id, "type": "tool_call"}
+        self._started[call_id] = (args, asyncio.create_task(self._execute(call)))
+        stats["dispatched"] += 1
+
+    def take(self, call: dict) -> Optional[asyncio.Task]:
+        """The early start of a tool call, if it was made with the same arguments."""
+        started = self._started.pop(call["id"], None)
+        if started is None:
+            return None
+        args, task = started
+        if args != call["args"]:
+            task.cancel()
+            stats["wasted"] += 1
+            return None
+        return task
+
+    def close(self) -> None:
+        """Cancel the early starts the tool node never asked for."""
+        for _, task in self._started.values():
+            task.cancel()
+        stats["wasted"] += len(self._started)
+        self._started.clear()
+        self._buffers.clear()
+
+
+def current() -> Optional[ToolDispatcher]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def scope(dispatcher: Optional[ToolDispatcher]) -> Iterator[Optional[ToolDispatcher]]:
+    """Run an agent request with a dispatcher (None keeps the normal dispatch)."""
+    token = _current.set(dispatcher)
+    try:
+        yield dispatcher
+    finally:
+        if dispatcher is not None:
+            dispatcher.close()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # an abandoned stream is closed from another context
+            pass
+
+
+class StreamingDispatchMiddleware(AgentMiddleware):
+    """Agent middleware that streams the model calls of a dispatching run and serves its early-started tool calls."""
+
+    def __init__(self, tools: list, inner: list):
+        """
+        :param tools: tools of the graph
+        :param inner: the tool middleware below this one, outermost first, which early calls run through as well
+        """
+        super().__init__()
+        # not "tools": AgentMiddleware.tools are the tools a middleware adds to the graph
+        self.dispatchable = {t.name: t for t in tools if not _has_injected_args(t)}
+        self.inner = inner
+
+    def dispatcher(self) -> ToolDispatcher:
+        """A dispatcher for one run, to pass in the run's callbacks and to scope()."""
+        return ToolDispatcher(self._execute, self.dispatchable)
+
+    async def _execute(self, call: dict) -> Any:
+        tool = self.dispatchable[call["name"]]
+
+        async def run_tool(request: ToolCallRequest) -> Any:
+            result = await request.tool.ainvoke(request.tool_call)
+            if not isinstance(result, ToolMessage):
+                raise TypeError(f"tool {call['name']} returned {type(result).__name__}, left to the tool node")
+            result.content = msg_content_output(result.content)
+            return result
+
+        handler = run_tool
+        for middleware in reversed(self.inner):
+            handler = (lambda m, h: lambda r: m.awrap_tool_call(r, h))(middleware, handler)
+        return await handler(ToolCallRequest(tool_call=call, tool=tool, state=None, runtime=None))
+
+    # runs are only dispatched on the async path, sync runs pass through
+    def wrap_model_call(self, request: ModelRequest, handler: Callable) -> Any:
+        return handler(request)
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        return handler(request)
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable) -> Any:
+        if _current.get() is None:
+            return await handler(request)
+        # the streamed call reports its tool call chunks to the dispatcher
+        return await handler(request.override(model_settings={**request.model_settings, "stream": True}))
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        dispatcher = _current.get()
+        task = dispatcher.take(request.tool_call) if dispatcher is not None else None
+        if task is None:
+            return await handler(request)
+        try:
+            result = await task
+            stats["used"] += 1
+            return result
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+        except Exception as e:
+            get_logger().info(f"Early start of {request.tool_call['name']} failed, running it in the tool node: {e}")
+        stats["fallbacks"] += 1
+        return await handler(request)
@@ -0,0 +1,223 @@
+"""
+Tool execution limits for the agent graph.
+
+The graph's tool node already runs the tool calls of one model turn concurrently and returns their results in call
+order. ``ToolExecutionMiddleware`` wraps every call with the tool's own limits:
+
+* a per-tool semaphore, shared by all sessions, so heavyweight tools (PDF OCR, the URL extractor) cannot run more
+  than ``max_concurrency`` copies at once while lighter tools keep going;
+* a per-tool timeout; a call that times out or raises becomes an error ToolMessage for the model instead of failing
+  the whole turn, so one slow or broken tool does not block the others. A timeout cannot cancel a sync tool (on the
+  async path LangChain runs it in a thread too): its worker thread runs to completion in the background and keeps
+  the tool's slot until it finishes, so timed-out and cancelled calls still count against ``max_concurrency``.
+
+Limits are declared when a tool is registered with ``configure(tool, max_concurrency=..., timeout=...)``; tools
+loaded elsewhere (e.g. from MCP servers) take theirs from settings.TOOL_LIMITS by name, then TOOL_MAX_CONCURRENCY
+and TOOL_TIMEOUT. A limit of 0 (or None) disables it. Within a request budget (see request_budget.py) the timeout
+is clipped to the time the request has left, and tools are skipped once it has passed.
+"""
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+from langgraph.errors import GraphBubbleUp
+
+from src.agents_utils import request_budget
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+_MAX_CONCURRENCY = "max_concurrency"
+_TIMEOUT = "timeout"
+
+_lock = threading.Lock()
+_thread_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_async_semaphores: dict[tuple[int, str], asyncio.Semaphore] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+stats = {"calls": 0, "timeouts": 0, "errors": 0, "skipped": 0}
+
+
+def configure(tool: Any, *, max_concurrency: Optional[int] = None, timeout: Optional[float] = None) -> Any:
+    """
+    Declare the execution limits of a tool where it is registered
+    :param tool: BaseTool
+    :param max_concurrency: calls of this tool running at once across all sessions
+    :param timeout: seconds a single call may take
+    :return: the same tool, for chaining
+    """
+    limits = {_MAX_CONCURRENCY: max_concurrency, _TIMEOUT: timeout}
+    tool.metadata = {**(tool.metadata or {}), **{k: v for k, v in limits.items() if v is not None}}
+    return tool
+
+
+def limits_of(name: str, tool: Any = None) -> tuple[Optional[int], Optional[float]]:
+    """
+    Effective limits of a tool: declared at registration, then settings.TOOL_LIMITS, then the defaults
+    :param name: tool name
+    :param tool: BaseTool, if registered
+    :return: max concurrency and timeout, None when unlimited
+    """
+    declared = dict(settings.TOOL_LIMITS.get(name, {}))
+    declared.update((getattr(tool, "metadata", None) or {}))
+    max_concurrency = declared.get(_MAX_CONCURRENCY, settings.TOOL_MAX_CONCURRENCY)
+    timeout = declared.get(_TIMEOUT, settings.TOOL_TIMEOUT)
+    return max_concurrency or None, timeout or None
+
+
+def _async_semaphore(name: str, limit: Optional[int]) -> Optional[asyncio.Semaphore]:
+    if limit is None:
+        return None
+    # asyncio semaphores belong to one loop; the agent normally runs on the async runner's loop only
+    key = (id(asyncio.get_running_loop()), name)
+    with _lock:
+        semaphore = _async_semaphores.get(key)
+        if semaphore is None:
+            semaphore = _async_semaphores[key] = asyncio.Semaphore(limit)
+        return semaphore
+
+
+def _release_from_worker(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore) -> None:
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:
+        pass  # the loop is closed, and its semaphores with it
+
+
+def _thread_semaphore(name: str, limit: Optional[int]) -> Any:
+    if limit is None:
+        return contextlib.nullcontext()
+    with _lock:
+        semaphore = _thread_semaphores.get(name)
+        if semaphore is None:
+            semaphore = _thread_semaphores[name] = threading.BoundedSemaphore(limit)
+        return semaphore
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="tool-timeout")
+        return _executor
+
+
+def _runs_in_thread(tool: Any) -> bool:
+    """Whether a tool has no async implementation, so it runs in a worker thread on the async path as well."""
+    if isinstance(tool, (StructuredTool, Tool)):
+        return tool.coroutine is None
+    return isinstance(tool, BaseTool) and type(tool)._arun is BaseTool._arun
+
+
+class _ThreadedTool:
+    """
+    Stand-in for a sync tool on the async path: it runs the tool on the middleware's executor instead of LangChain's,
+    so the worker thread that a timeout or cancellation leaves behind is known (``future``)
+    """
+
+    def __init__(self, tool: BaseTool):
+        self._tool = tool
+        self.future = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._tool, name)
+
+    async def ainvoke(self, tool_input: Any, config: Any = None, **kwargs: Any) -> Any:
+        context = contextvars.copy_context()
+        self.future = _get_executor().submit(context.run, self._tool.invoke, tool_input, config, **kwargs)
+        return await asyncio.wrap_future(self.future)
+
+
+def _error_message(request: ToolCallRequest, text: str) -> ToolMessage:
+    call = request.tool_call
+    return ToolMessage(content=f"Error: {text}", tool_call_id=call["id"], name=call["name"], status="error")
+
+
+class ToolExecutionMiddleware(AgentMiddleware):
+    """Agent middleware that applies the per-tool concurrency limit and timeout to every tool call."""
+
+    def _failed(self, request: ToolCallRequest, error: BaseException, timeout: Optional[float]) -> ToolMessage:
+        name = request.tool_call["name"]
+        with _lock:
+            if isinstance(error, (asyncio.TimeoutError, FutureTimeoutError)):
+                stats["timeouts"] += 1
+                text = f"tool {name} timed out after {timeout:g}s"
+            else:
+                stats["errors"] += 1
+                text = f"tool {name} failed: {error}"
+        get_logger().warning(text)
+        return _error_message(request, text)
+
+    @staticmethod
+    def _skipped(request: ToolCallRequest) -> Optional[ToolMessage]:
+        budget = request_budget.current()
+        if budget is None or not budget.expired():
+            return None
+        with _lock:
+            stats["skipped"] += 1
+        return _error_message(request, f"tool {request.tool_call['name']} skipped, the request deadline has passed")
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        if (skipped := self._skipped(request)) is not None:
+            return skipped
+        name = request.tool_call["name"]
+        max_concurrency, timeout = limits_of(name, request.tool)
+        timeout = request_budget.clip(timeout)
+        with _lock:
+            stats["calls"] += 1
+        semaphore = _thread_semaphore(name, max_concurrency)
+        try:
+            if timeout is None:
+                with semaphore:
+                    return handler(request)
+            semaphore.__enter__()
+            try:
+                future = _get_executor().submit(handler, request)
+            except BaseException:
+                semaphore.__exit__(None, None, None)
+                raise
+            # the worker thread cannot be interrupted, it finishes in the background after a timeout and only
+            # then frees the slot
+            future.add_done_callback(lambda _: semaphore.__exit__(None, None, None))
+            return future.result(timeout)
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            return self._failed(request, e, timeout)
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        if (skipped := self._skipped(request)) is not None:
+            return skipped
+        name = request.tool_call["name"]
+        max_concurrency, timeout = limits_of(name, request.tool)
+        timeout = request_budget.clip(timeout)
+        with _lock:
+            stats["calls"] += 1
+        semaphore = _async_semaphore(name, max_concurrency)
+        start = time.perf_counter()
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            waited = time.perf_counter() - start
+            if waited > 1:
+                get_logger().info(f"Tool {name} waited {waited:.1f}s for a free slot")
+            threaded = _ThreadedTool(request.tool) if semaphore is not None and _runs_in_thread(request.tool) else None
+            try:
+                call = request if threaded is None else request.override(tool=threaded)
+                return await asyncio.wait_for(handler(call), timeout)
+            finally:
+                if threaded is not None and threaded.future is not None:
+                    # a timeout or cancellation leaves the worker thread running, it frees the slot when it ends
+                    loop = asyncio.get_running_loop()
+                    threaded.future.add_done_callback(lambda _: _release_from_worker(loop, semaphore))
+                elif semaphore is not None:
+                    semaphore.release()
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            return self._failed(request, e, timeout)
@@ -0,0 +1,188 @@
+"""
+Per-query tool-schema pruning.
+
+Binding every tool of a large toolset (time, weather, calculator, Wikipedia, Semantic Scholar, Tavily, ...) to
+every model call costs thousands of prompt tokens per turn. ``ToolIndex`` is a local BM25 index over the tool names,
+descriptions and argument names; ``ToolPruningMiddleware`` uses it to bind only the TOOL_PRUNING_TOP_K most relevant
+tools to each model call of the agent graph. The graph's tool node still holds every tool.
+
+The full set is bound instead when no tool matches the query at all, and when Groq rejects a call because the model
+asked for a tool that was not bound; the call is then repeated with the full set. The system prompt keeps listing
+every tool, so the model can still name one that was pruned.
+
+Pruning trades cached prompt tokens for fewer prompt tokens: the tool schemas come before the history, so binding a
+different subset per query breaks the stable prefix the provider's prompt cache serves from (see prompt_cache.py and
+the context window). It pays off for large toolsets with short conversations and is off by default (TOOL_PRUNING).
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest
+from langchain_core.messages import HumanMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.config import settings
+from src.utils import token_count
+from src.utils.logging_config import get_logger
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from get how i in is it me my of on or please the this to use "
+    "used uses using what when which who will with you your".split()
+)
+# Groq rejects a response whose tool call names a tool missing from request.tools
+_MISSING_TOOL_ERRORS = ("not in request.tools", "tool call validation failed")
+
+
+def _terms(text: str) -> list[str]:
+    """Lowercase word terms with a light suffix stemming, so 'forecasts' matches 'forecast'."""
+    terms = []
+    for word in _WORD.findall(_CAMEL.sub(" ", text).replace("_", " ").lower()):
+        if word in _STOPWORDS:
+            continue
+        for suffix in ("ing", "ed", "es", "s"):
+            if len(word) > len(suffix) + 3 and word.endswith(suffix):
+                word = word[: -len(suffix)]
+                break
+        terms.append(word)
+    return terms
+
+
+def _schema_tokens(tool: Any) -> int:
+    try:
+        return token_count.count_text(json.dumps(convert_to_openai_tool(tool)))
+    except Exception:
+        return 0
+
+
+class ToolIndex:
+
+    def __init__(self, tools: list, k1: float = 1.2, b: float = 0.75):
+        """
+        BM25 index over tool names (weighted twice), descriptions and argument names
+        :param tools: tools to index
+        :param k1: BM25 term-frequency saturation
+        :param b: BM25 length normalisation
+        """
+        self.tools = list(tools)
+        self.k1, self.b = k1, b
+        self._docs: list[Counter] = []
+        for tool in self.tools:
+            name = getattr(tool, "name", "")
+            args = " ".join(getattr(tool, "args", None) or {})
+            self._docs.append(Counter(_terms(name) * 2 + _terms(getattr(tool, "description", "") or "") + _terms(args)))
+        self._avg_len = sum(sum(d.values()) for d in self._docs) / max(len(self._docs), 1)
+        df = Counter(term for doc in self._docs for term in doc)
+        n = len(self._docs)
+        self._idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+        self.schema_tokens = {getattr(t, "name", str(i)): _schema_tokens(t) for i, t in enumerate(self.tools)}
+
+    def scores(self, query: str) -> list[float]:
+        """BM25 score of every tool for a query, in index order."""
+        terms = [t for t in _terms(query) if t in self._idf]
+        result = []
+        for doc in self._docs:
+            length = sum(doc.values())
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / self._avg_len)
+                    score += self._idf[term] * tf * (self.k1 + 1) / norm
+            result.append(score)
+        return result
+
+    def select(self, query: str, k: int) -> Optional[list]:
+        """
+        Top-k tools for a query, in their original order
+        :param query: user query
+        :param k: maximum number of tools
+        :return: the selected tools, None when no tool matches and the full set should be bound
+        """
+        scores = self.scores(query)
+        ranked = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: -scores[i])[:k]
+        if not ranked:
+            return None
+        return [self.tools[i] for i in sorted(ranked)]
+
+
+def _query_of(messages: list) -> str:
+    """The latest user turn plus the one before it, so short follow-ups keep their topic."""
+    turns = []
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            content = message.content
+            if isinstance(content, list):
+                content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+            turns.append(content)
+            if len(turns) == 2:
+                break
+    return " ".join(reversed(turns))
+
+
+def _is_missing_tool_error(error: Exception) -> bool:
+    text = str(error)
+    return any(marker in text for marker in _MISSING_TOOL_ERRORS)
+
+
+class ToolPruningMiddleware(AgentMiddleware):
+    """Agent middleware that binds only the most relevant tools to each model call."""
+
+    def __init__(self, tools: list, top_k: Optional[int] = None):
+        """
+        Create the middleware
+        :param tools: every tool of the agent
+        :param top_k: tools bound per call, defaults to settings.TOOL_PRUNING_TOP_K
+        """
+        super().__init__()
+        self.index = ToolIndex(tools)
+        self.top_k = settings.TOOL_PRUNING_TOP_K if top_k is None else top_k
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "pruned": 0, "full_fallbacks": 0, "schema_tokens_saved": 0}
+
+    def _prune(self, request: ModelRequest) -> tuple[ModelRequest, bool]:
+        selected = self.index.select(_query_of(request.messages), self.top_k)
+        names = {getattr(t, "name", None) for t in selected or []}
+        # provider tool dicts are not indexed and always kept
+        tools = [t for t in request.tools if isinstance(t, dict) or getattr(t, "name", None) in names]
+        pruned = selected is not None and len(tools) < len(request.tools)
+        with self._lock:
+            self.stats["calls"] += 1
+            if pruned:
+                self.stats["pruned"] += 1
+                self.stats["schema_tokens_saved"] += sum(
+                    tokens for name, tokens in self.index.schema_tokens.items() if name not in names
+                )
+        if pruned:
+            get_logger().debug(f"Tool pruning: bound {sorted(n for n in names if n)} of {len(request.tools)} tools")
+        return (request.override(tools=tools) if pruned else request), pruned
+
+    def _fallback(self, error: Exception) -> None:
+        with self._lock:
+            self.stats["full_fallbacks"] += 1
+        get_logger().info(f"Tool pruning: model asked for an unbound tool, retrying with the full set ({error})")
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable) -> Any:
+        pruned_request, pruned = self._prune(request)
+        try:
+            return handler(pruned_request)
+        except Exception as e:
+            if not pruned or not _is_missing_tool_error(e):
+                raise
+            self._fallback(e)
+            return handler(request)
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable) -> Any:
+        pruned_request, pruned = self._prune(request)
+        try:
+            return await handler(pruned_request)
+        except Exception as e:
+            if not pruned or not _is_missing_tool_error(e):
+                raise
+            self._fallback(e)
+            return await handler(request)
@@ -0,0 +1,194 @@
+"""
+Local retries of transient tool failures.
+
+The MCP tools report failures as text ("Error happened during search call: ... Check the error and try again"), and
+the model then spends a whole round-trip calling the tool again. ``ToolRetryMiddleware`` classifies every failed
+result (error ToolMessages, "Error ..." texts and raised exceptions): transient failures (timeouts, 5xx and 429
+responses, connection resets and refusals) are retried locally with full-jitter exponential backoff, and only
+permanent failures, or transient ones that ran out of retries, reach the model.
+
+Retries are bounded three ways: per call (``max_retries`` of the tool in settings.TOOL_LIMITS or its metadata, then
+TOOL_MAX_RETRIES), by a process-wide retry budget (every call earns TOOL_RETRY_BUDGET_RATIO retries, so an outage
+cannot multiply the load on a failing service) and by the deadline of the running request. A retry that succeeds
+saves the model turn that would have re-issued the call, which is counted in ``stats["turns_saved"]``.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langgraph.errors import GraphBubbleUp
+from langgraph.types import Command
+
+from src.agents_utils import direct_return, request_budget
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+_MAX_RETRIES = "max_retries"
+_TRANSIENT = re.compile(
+    r"timed? ?out|connection (?:reset|refused|aborted|error)|reset by peer|broken pipe|remote (?:end|host) closed"
+    r"|temporar(?:y|ily) (?:unavailable|failure)|service unavailable|bad gateway|too many requests|rate limit"
+    r"|max retries exceeded|name resolution|network is unreachable"
+    r"|\b(?:408|429|50[0234]) (?:server error|client error)|(?:status|http|code)\W{0,3}(?:408|429|50[0234])\b",
+    re.IGNORECASE,
+)
+_TRANSIENT_ERRORS = (TimeoutError, asyncio.TimeoutError, ConnectionError)
+
+_lock = threading.Lock()
+stats = {"calls": 0, "retries": 0, "recovered": 0, "exhausted": 0, "permanent": 0, "budget_denied": 0,
+         "turns_saved": 0}
+
+
+def max_retries_of(name: str, tool: Any = None) -> int:
+    """Retries allowed for one call of a tool: declared in its metadata, then settings.TOOL_LIMITS, then the default."""
+    declared = dict(settings.TOOL_LIMITS.get(name, {}))
+    declared.update((getattr(tool, "metadata", None) or {}))
+    return int(declared.get(_MAX_RETRIES, settings.TOOL_MAX_RETRIES) or 0)
+
+
+def _message_of(result: Any) -> Optional[ToolMessage]:
+    """The ToolMessage of a tool result, also inside a Command (e.g. a failed direct-return call)."""
+    if isinstance(result, ToolMessage):
+        return result
+    if isinstance(result, Command) and isinstance(result.update, dict):
+        return next((m for m in result.update.get("messages", ()) if isinstance(m, ToolMessage)), None)
+    return None
+
+
+def classify(result: Any = None, error: Optional[BaseException] = None) -> Optional[str]:
+    """
+    Failure class of a tool outcome
+    :param result: returned tool result
+    :param error: raised exception, instead of a result
+    :return: None on success, "transient" or "permanent"
+    """
+    if error is not None:
+        if isinstance(error, _TRANSIENT_ERRORS) or _TRANSIENT.search(f"{type(error).__name__}: {error}"):
+            return "transient"
+        return "permanent"
+    message = _message_of(result)
+    if message is None or not direct_return.failed(message):
+        return None
+    return "transient" if _TRANSIENT.search(str(message.content)) else "permanent"
+
+
+class RetryBudget:
+
+    def __init__(self, ratio: float, reserve: float):
+        """
+        Token bucket of retries shared by all tool calls
+        :param ratio: retries earned per call
+        :param reserve: retries available up front, also the bucket size
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.reserve, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+_budget: Optional[RetryBudget] = None
+
+
+def get_budget() -> RetryBudget:
+    """Return the process-wide retry budget."""
+    global _budget
+    with _lock:
+        if _budget is None:
+            _budget = RetryBudget(settings.TOOL_RETRY_BUDGET_RATIO, settings.TOOL_RETRY_BUDGET_RESERVE)
+        return _budget
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter delay before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(settings.TOOL_RETRY_MAX_DELAY, settings.TOOL_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _count(key: str) -> None:
+    with _lock:
+        stats[key] += 1
+
+
+class ToolRetryMiddleware(AgentMiddleware):
+    """Agent middleware that retries transient tool failures locally."""
+
+    @staticmethod
+    def _next_delay(request: ToolCallRequest, attempt: int, failure: Optional[str]) -> Optional[float]:
+        """Delay before the next attempt, None when the outcome stands."""
+        name = request.tool_call["name"]
+        if failure is None:
+            if attempt:
+                _count("recovered")
+                _count("turns_saved")
+                get_logger().info(f"Tool {name} recovered after {attempt} local retries, one model turn saved")
+            return None
+        if failure == "permanent":
+            _count("permanent")
+            return None
+        if attempt >= max_retries_of(name, request.tool):
+            _count("exhausted")
+            return None
+        delay = backoff(attempt)
+        budget = request_budget.current()
+        if budget is not None and budget.remaining() is not None and budget.remaining() <= delay:
+            _count("exhausted")
+            return None
+        if not get_budget().withdraw():
+            _count("budget_denied")
+            get_logger().warning(f"Tool {name}: retry budget spent, returning the transient failure")
+            return None
+        _count("retries")
+        get_logger().info(f"Tool {name} failed transiently, retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        _count("calls")
+        get_budget().deposit()
+        attempt = 0
+        while True:
+            try:
+                result, error = handler(request), None
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                result, error = None, e
+            delay = self._next_delay(request, attempt, classify(result, error))
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            time.sleep(delay)
+            attempt += 1
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable) -> Any:
+        _count("calls")
+        get_budget().deposit()
+        attempt = 0
+        while True:
+            try:
+                result, error = await handler(request), None
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                result, error = None, e
+            delay = self._next_delay(request, attempt, classify(result, error))
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
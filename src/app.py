@@ -1,13 +1,16 @@
 """
 Application class for managing chatbot interactions.
 """
+import time
 from typing import Optional, Tuple, List
-import asyncio
 from langchain_core.messages import BaseMessage
 
 from src.agents_utils.chatbot import Chatbot
 from src.agents_utils.agent import Agent
+from src.agents_utils.query_router import QueryRouter
+from src.config import settings
 from src.utils.logging_config import get_logger
+from src.utils import async_runner
 
 
 class App:
@@ -23,6 +26,11 @@ class App:
         clients: list = None,
         tools: list = None,
         show_graph: bool = False,
+        cache_namespace: Optional[str] = None,
+        context_token_budget: Optional[int] = None,
+        deadline: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        tool_dispatch: Optional[str] = None,
     ):
         """
         Initialize the App with a Chatbot instance.
@@ -31,6 +39,11 @@ class App:
             system_text (str): System prompt for the chatbot.
             chat_history_limit (int): Maximum conversation history to keep.
             show_graph (bool): Whether to display the workflow graph.
+            cache_namespace (str): Semantic cache namespace, e.g. the bot name.
+            context_token_budget (int): Token budget of the history window, defaults to the settings.
+            deadline (float): Seconds per agent request, defaults to the settings of the bot.
+            max_iterations (int): Model calls per agent request, defaults to the settings of the bot.
+            tool_dispatch (str): "streaming" or "message", when agent tools start, defaults to the settings.
         """
         if tools is None:
             tools = []
@@ -44,13 +57,21 @@ class App:
                 chat_history_limit=chat_history_limit,
                 tools=all_tools,
                 show_graph=show_graph,
+                cache_namespace=cache_namespace,
+                context_token_budget=context_token_budget,
+                deadline=deadline,
+                max_iterations=max_iterations,
+                tool_dispatch=tool_dispatch,
             )
         else:
             self.bot = Chatbot(
                 system_text=system_text,
                 chat_history_limit=chat_history_limit,
                 show_graph=show_graph,
+                cache_namespace=cache_namespace,
+                context_token_budget=context_token_budget,
             )
+        self.router = QueryRouter() if isinstance(self.bot, Agent) else None
         self.messages: List = []
         get_logger().info("App initialized successfully.")
 
@@ -69,7 +90,7 @@ class App:
             if isinstance(self.bot, Chatbot):
                 response, messages = self.bot.ask(query, messages=self.messages)
             else:
-                response, messages = asyncio.run(self.bot.ask(query, messages=self.messages))
+                response, messages = self._ask_agent(query)
             self.messages = messages
             get_logger().info(f"Response generated successfully.")
             return response, messages
@@ -77,6 +98,31 @@ class App:
             get_logger().error(f"Error during ask: {e}")
             raise
 
+    def _ask_agent(self, query: str) -> tuple[str, list]:
+        """
+        Answer with the Agent, sending trivial turns to its light path when the router is enabled.
+
+        Args:
+            query (str): User query.
+
+        Returns:
+            Tuple[str, List]: Response text and updated message history.
+        """
+        if not settings.ROUTER:
+            return async_runner.run(self.bot.ask(query, messages=self.messages))
+        decision = self.router.decide(query)
+        start = time.perf_counter()
+        if decision.route == "light":
+            try:
+                result = async_runner.run(self.bot.ask_light(query, messages=self.messages))
+                self.router.record(decision, time.perf_counter() - start)
+                return result
+            except Exception as e:
+                get_logger().warning(f"Light path failed, escalating to the agent: {e}")
+        result = async_runner.run(self.bot.ask(query, messages=self.messages))
+        self.router.record(decision, time.perf_counter() - start, escalated=decision.route == "light")
+        return result
+
     def stream_ask(self, query: str) -> tuple[BaseMessage, list | None]:
         """
         Stream a response from the chatbot.
@@ -92,7 +138,7 @@ class App:
             if isinstance(self.bot, Chatbot):
                 response, messages = self.bot.stream_ask(query, messages=self.messages)
             else:
-                response, messages = asyncio.run(self.bot.stream_ask(query, messages=self.messages))
+                response, messages = async_runner.run(self.bot.stream_ask(query, messages=self.messages))
             self.messages = messages
             get_logger().info("Streaming response completed.")
             return response, messages
@@ -104,6 +150,7 @@ class App:
         """Clear the conversation history."""
         get_logger().info("Clearing conversation history.")
         self.messages = []
+        self.bot.compactor.reset()
 
     def get_messages(self) -> List:
         """
@@ -123,3 +170,4 @@ class App:
         """
         get_logger().info(f"Setting messages with {len(messages)} items.")
         self.messages = messages
+        self.bot.compactor.reset()
@@ -3,7 +3,7 @@ import os
 import sys
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import Field
 
 parent_dir = os.path.dirname(os.path.dirname(__file__))
@@ -25,6 +25,137 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = None
     GROQ_ENDPOINT: Optional[str] = None
     TAVILY_API_KEY: Optional[str] = None
+    # Shared keep-alive HTTP pool used by every pooled chat client (see llm_chats/client_pool.py)
+    POOL_MAX_CONNECTIONS: int = 100
+    POOL_MAX_KEEPALIVE: int = 20
+    POOL_KEEPALIVE_EXPIRY: float = 60.0
+    # Compiled agent graphs shared by sessions with the same configuration, least recently used evicted first
+    # (see agents_utils/graph_registry.py)
+    GRAPH_REGISTRY_ITEMS: int = 32
+    # Exact-match response cache: memory LRU in front of SQLite (see llm_chats/response_cache.py)
+    RESPONSE_CACHE: bool = True
+    RESPONSE_CACHE_TTL: float = 3600.0  # seconds
+    RESPONSE_CACHE_MEMORY_ITEMS: int = 512
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # size of the SQLite tier
+    RESPONSE_CACHE_PATH: str = os.path.join(parent_dir, ".cache", "responses.sqlite")
+    # Opt-in semantic cache for paraphrased standalone queries (see llm_chats/semantic_cache.py)
+    SEMANTIC_CACHE: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9  # cosine similarity
+    SEMANTIC_CACHE_CAPACITY: int = 2048  # queries per namespace
+    SEMANTIC_CACHE_TTL: float = 3600.0  # seconds
+    SEMANTIC_CACHE_EXCLUDE: list[str] = [
+        "time", "now", "today", "tonight", "tomorrow", "yesterday", "current", "currently", "latest", "recent",
+        "weather", "forecast", "temperature", "rain", "news", "price", "stock", "clock", "timestamp", "date",
+    ]
+    # Hedged requests: fire BACKUP_MODEL_NAME when MODEL_NAME is slower than its latency percentile
+    HEDGING: bool = False
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_INITIAL_DELAY: float = 3.0  # seconds, used until enough latencies are observed
+    HEDGE_MIN_DELAY: float = 0.5
+    HEDGE_MAX_DELAY: float = 10.0
+    HEDGE_WINDOW: int = 200  # number of recent primary latencies
+    # Circuit breaker of MODEL_NAME, shared by all sessions (see llm_chats/circuit_breaker.py)
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_WINDOW: int = 20  # recent calls
+    BREAKER_MIN_CALLS: int = 5
+    BREAKER_COOLDOWN: float = 30.0  # seconds
+    BREAKER_HALF_OPEN_PROBES: int = 1
+    # Per-minute quotas enforced by llm_chats/rate_limiter.py, 0 disables a bucket.
+    # Per model, e.g. {"openai/gpt-oss-120b": {"rpm": 30, "tpm": 8000}}; other models use the defaults below
+    RATE_LIMITS: dict[str, dict[str, int]] = {}
+    RATE_LIMIT_RPM: int = 0
+    RATE_LIMIT_TPM: int = 0
+    # Least-latency routing of MODEL_NAME requests across endpoints (see llm_chats/endpoint_pool.py), e.g.
+    # [{"name": "groq", "kind": "groq"}, {"name": "local", "kind": "openai", "base_url": "http://localhost:8000/v1"}]
+    ENDPOINTS: list[dict] = []
+    ENDPOINT_EWMA_ALPHA: float = 0.3
+    ENDPOINT_EJECT_AFTER: int = 3  # consecutive failures
+    ENDPOINT_EJECT_SECONDS: float = 30.0
+    ENDPOINT_HEALTH_INTERVAL: float = 15.0  # seconds, 0 disables background health checks
+    # Preprocessing of local images sent with ask_visual (see utils/image_preprocessing.py)
+    IMAGE_MAX_SIDE: int = 1536  # pixels, longest side
+    IMAGE_FORMAT: str = "JPEG"  # or "WEBP"
+    IMAGE_QUALITY: int = 85
+    IMAGE_CACHE_ITEMS: int = 64  # encoded payloads kept in memory
+    # Token budget of the chat history sent with each turn (see agents_utils/context_window.py),
+    # 0 falls back to the last chat_history_limit messages
+    CONTEXT_TOKEN_BUDGET: int = 6000
+    CONTEXT_TRIM_RATIO: float = 0.6  # on overflow trim to this share of the limits, 1.0 slides on every turn
+    # Rolling summary of the turns evicted from the window (see agents_utils/compaction.py)
+    COMPACTION: bool = True
+    COMPACTION_MODEL: Optional[str] = None  # defaults to BACKUP_MODEL_NAME
+    COMPACTION_TRIGGER_TOKENS: int = 1500  # evicted, not yet summarized tokens
+    COMPACTION_SUMMARY_TOKENS: int = 400
+    COMPACTION_TOOL_CHARS: int = 300  # tool results/arguments are clipped to this before summarizing
+    # Local router in front of App.ask: trivial turns skip the agent graph (see agents_utils/query_router.py)
+    ROUTER: bool = True
+    # Bind only the most relevant tools to each agent model call (see agents_utils/tool_retrieval.py). Off by default:
+    # a per-query tool subset changes the tool schemas in front of the history, so consecutive turns lose their cached
+    # prompt prefix (compare both with Examples/tool_pruning_benchmark.py)
+    TOOL_PRUNING: bool = False
+    TOOL_PRUNING_TOP_K: int = 5
+    # Per-tool execution limits of the agent graph (see agents_utils/tool_execution.py and tool_retry.py), 0 disables
+    # a limit. By tool name for tools that do not declare their own, e.g. the MCP tools
+    TOOL_LIMITS: dict[str, dict[str, float]] = {
+        "read_url": {"max_concurrency": 1, "timeout": 120, "max_retries": 1},
+        "extract": {"max_concurrency": 2, "timeout": 60},
+    }
+    TOOL_MAX_CONCURRENCY: int = 8
+    TOOL_TIMEOUT: float = 30.0  # seconds
+    # Local retries of transient tool failures (timeouts, 5xx/429, connection resets) before the model sees them
+    TOOL_MAX_RETRIES: int = 2
+    TOOL_RETRY_BASE_DELAY: float = 0.5  # seconds, full-jitter exponential backoff
+    TOOL_RETRY_MAX_DELAY: float = 4.0
+    TOOL_RETRY_BUDGET_RATIO: float = 0.2  # retries earned per tool call, process-wide
+    TOOL_RETRY_BUDGET_RESERVE: float = 10.0  # retries available up front
+    # Memoized tool results by tool name (see agents_utils/tool_cache.py): None keeps a result forever,
+    # seconds expire it, 0 disables caching for the tool
+    TOOL_CACHE_TTLS: dict[str, Optional[float]] = {
+        "calculate": None,
+        "list_functions": None,
+        "convert_timestamp_to_date": None,
+        "get_time": 0,
+        "get_unix_timestamp": 0,
+        "world_clock_dashboard": 0,
+        "get_current_weather": 600,
+        "get_hourly_weather": 1800,
+        "get_weather_forecast": 1800,
+        "get_weather_summary": 600,
+        "get_weather_alerts": 300,
+        "search": 600,
+        "extract": 3600,
+        "wikipedia_search": 86400,
+        "semanticscholar": 86400,
+    }
+    TOOL_CACHE_DEFAULT_TTL: Optional[float] = 0  # tools without a policy may have side effects
+    TOOL_CACHE_ITEMS: int = 1024
+    # When agent tools start (see agents_utils/tool_dispatch.py): "streaming" starts each call as soon as its
+    # arguments are complete in the model stream, "message" after the whole AI message
+    TOOL_DISPATCH: Literal["message", "streaming"] = "streaming"
+    # End-to-end budget of one agent request (see agents_utils/request_budget.py): wall-clock seconds and model
+    # calls, 0 disables a limit; per bot by name in REQUEST_BUDGETS
+    REQUEST_DEADLINE: float = 90.0
+    REQUEST_MAX_ITERATIONS: int = 6
+    REQUEST_BUDGETS: dict[str, dict[str, float]] = {}  # e.g. {"General": {"deadline": 120, "max_iterations": 8}}
+    REQUEST_ANSWER_RESERVE: float = 8.0  # seconds kept for the final answer, no tool rounds below this
+    REQUEST_PARTIAL_TOOL_CHARS: int = 1500  # per tool result in an answer cut short by the budget
+    REQUEST_BUDGET_NOTICE: str = "I ran out of time for this request; here is what I found so far."
+    # Tools whose output ends the agent turn without a second model call (see agents_utils/direct_return.py), by
+    # name, with an optional str.format template over the call arguments and {result}
+    TOOL_RETURN_DIRECT: dict[str, Optional[str]] = {
+        "calculate": "{expression} = {result}",
+        "get_time": None,
+        "world_clock_dashboard": None,
+        "get_current_weather": None,
+        "get_weather_forecast": None,
+        "get_hourly_weather": None,
+        "get_weather_summary": None,
+        "get_weather_alerts": None,
+    }
+    # Record/replay of Groq traffic (see llm_chats/cassette.py): None, "record" or "replay"
+    CASSETTE_MODE: Optional[Literal["record", "replay"]] = None
+    CASSETTE_PATH: str = os.path.join(parent_dir, ".cassettes", "default.jsonl.gz")
+    CASSETTE_REPLAY_LATENCY: bool = False  # replay with the recorded latencies instead of at full speed
 
     class Config:
         env_file = ".env"
@@ -1,10 +1,15 @@
+import asyncio
 import os
+import time
 
 from langchain_core.messages import AIMessage, BaseMessage
-from langchain_groq import ChatGroq
-from typing import  Union
+from typing import AsyncIterator, Optional, Union
 
 from src.config import settings, logger
+from src.llm_chats import (
+    circuit_breaker, client_pool, endpoint_pool, hedging, prompt_cache, response_cache, semantic_cache,
+)
+from src.utils import async_runner, batching, history_transforms
 from src.utils.create_visual_payload import (
     visual_path,
     visual_public_url,
@@ -13,65 +18,224 @@ from src.utils.create_visual_payload import (
 )
 
 if not settings.GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY is not set in settings/.env")
+    if settings.CASSETTE_MODE != "replay":
+        raise ValueError("GROQ_API_KEY is not set in settings/.env")
+    # replaying cassettes never reaches the API
+    settings.GROQ_API_KEY = "replay"
 os.environ["GROQ_API_KEY"] = settings.GROQ_API_KEY
 
 
 class Groq:
 
-    def __init__(self, system_text="You are an helpful AI assistant."):
+    def __init__(self, system_text="You are an helpful AI assistant.", cache_namespace: Optional[str] = None):
         """
-        Create Groq chat llm given system text
+        Create Groq chat llm given system text, borrowing the pooled clients of the configured models
+        :param system_text: system prompt
+        :param cache_namespace: semantic cache namespace (e.g. the bot name), defaults to a hash of system_text
         """
         self.system_text = system_text
-        common_kwargs = dict(
-            temperature=settings.TEMPERATURE,
-            max_tokens=settings.MAX_TOKENS,
-            reasoning_format="parsed" if settings.REASONING else None,
-            timeout=settings.TIMEOUT,
-            max_retries=settings.MAX_RETERIES,
-        )
-        self.llm = ChatGroq(model=settings.MODEL_NAME, **common_kwargs)
-        self.backup_llm = ChatGroq(model=settings.BACKUP_MODEL_NAME, **common_kwargs)
+        self.cache_namespace = semantic_cache.namespace_of(system_text, cache_namespace)
+        self.llm = client_pool.get_chat_model(settings.MODEL_NAME)
+        self.backup_llm = client_pool.get_chat_model(settings.BACKUP_MODEL_NAME)
+
+    def _build_messages(self, query: Union[str, list]) -> list:
+        """
+        Prepend the system text to the given query, in the same shape for both kinds of query so the prompt prefix is
+        stable; in a list of messages only the newest copy of each image is kept
+        :param query: given query, either a string or a list of messages
+        :return: messages to send to the llm
+        """
+        if isinstance(query, list):
+            return prompt_cache.assemble(self.system_text, history_transforms.dedupe_images(query))
+        return prompt_cache.assemble(self.system_text, [{"role": "user", "content": f"{query}"}])
+
+    def _lookup(self, query: Union[str, list], messages: list, cache: bool) -> tuple[Optional[str], Optional[BaseMessage]]:
+        """
+        Look the request up in the exact-match cache, then in the semantic cache
+        :return: exact cache key (None when caching is disabled) and the cached response if any
+        """
+        if not cache:
+            return None, None
+        key = None
+        if settings.RESPONSE_CACHE:
+            key = response_cache.make_key(settings.MODEL_NAME, settings.TEMPERATURE, settings.MAX_TOKENS, messages)
+            cached = response_cache.get_cache().get(key)
+            if cached is not None:
+                return key, cached
+        answer = semantic_cache.lookup(self.cache_namespace, query)
+        if answer is not None:
+            return key, AIMessage(content=answer, response_metadata={"cache": "semantic"})
+        return key, None
+
+    def _store(self, key: Optional[str], query: Union[str, list], cache: bool, response: BaseMessage) -> BaseMessage:
+        """Cache a successful response in the exact-match and semantic caches"""
+        if cache and "error" not in response.response_metadata:
+            if key:
+                response_cache.get_cache().put(key, response)
+            semantic_cache.store(self.cache_namespace, query, response.content)
+        return response
 
-    def ask(self, query: Union[str, list]) -> BaseMessage:
+    def ask(self, query: Union[str, list], cache: bool = True) -> BaseMessage:
         """
-        Generate response based on the system text and given query
+        Generate response based on the system text and given query.
+        Runs aask on the shared background loop, so hedging and the pooled async connections apply here too.
         :param query: given query
+        :param cache: whether to serve/store the answer from/in the response caches,
+        disable it for calls that must be sampled anew
         :return: response, always a BaseMessage (an AIMessage wraps any error)
         """
-        if isinstance(query, list):
-            messages = [
-                {
-                    "role": "system",
-                    "content": [
-                                   {
-                                       "type": "text",
-                                       "text": self.system_text
-                                   },
-                    ]
-                }
-            ] + query
-        else:
-            messages = [
-                ("system", self.system_text),
-                ("human", f"{query}"),
-            ]
+        return async_runner.run(self.aask(query, cache=cache))
+
+    async def aask(self, query: Union[str, list], cache: bool = True) -> BaseMessage:
+        """
+        Async version of ask, using the native ainvoke of the pooled clients
+        :param query: given query
+        :param cache: whether to serve/store the answer from/in the response caches
+        :return: response, always a BaseMessage (an AIMessage wraps any error)
+        """
+        messages = self._build_messages(query)
+        key, cached = self._lookup(query, messages, cache)
+        if cached is not None:
+            return cached
         try:
-            return self.llm.invoke(messages)
+            return self._store(key, query, cache, await self._agenerate(messages))
         except Exception as e:
-            logger.warning(f"Model changes from {settings.MODEL_NAME} to {settings.BACKUP_MODEL_NAME} due to error {e}")
+            logger.error(f"Error at generating response: {e}")
+            return AIMessage(content=f"Error at generating response: {e}", response_metadata={"error": str(e)})
+
+    def ask_batch(self, queries: list, max_concurrency: int = 8, cache: bool = True) -> list[BaseMessage]:
+        """
+        Answer many independent queries concurrently
+        :param queries: queries, each as accepted by ask
+        :param max_concurrency: maximum number of requests in flight
+        :param cache: whether to use the response caches
+        :return: responses in input order; a failed item is an AIMessage whose response_metadata has "error"
+        """
+        return async_runner.run(self.aask_batch(queries, max_concurrency=max_concurrency, cache=cache))
+
+    async def aask_batch(self, queries: list, max_concurrency: int = 8, cache: bool = True) -> list[BaseMessage]:
+        """
+        Async version of ask_batch
+        :param queries: queries, each as accepted by ask
+        :param max_concurrency: maximum number of requests in flight
+        :param cache: whether to use the response caches
+        :return: responses in input order; a failed item is an AIMessage whose response_metadata has "error"
+        """
+        results = await batching.map_concurrent(
+            lambda q: self.aask(q, cache=cache), queries, max_concurrency=max_concurrency
+        )
+        return [
+            AIMessage(content=f"Error at generating response: {r}", response_metadata={"error": str(r)})
+            if isinstance(r, Exception) else r
+            for r in results
+        ]
+
+    async def _agenerate(self, messages: list) -> BaseMessage:
+        """
+        Call the primary model, either hedged with the backup model or with the backup as sequential fallback.
+        While the primary's circuit breaker is open, requests go straight to the backup model.
+        :param messages: messages to send
+        :return: response of whichever model answered
+        """
+        breaker = circuit_breaker.get_breaker(settings.MODEL_NAME)
+        if not breaker.allow_request():
+            return await self.backup_llm.ainvoke(messages)
+        if settings.HEDGING:
+            response, winner = await hedging.hedged(
+                lambda: self._aprimary(messages, breaker),
+                lambda: self.backup_llm.ainvoke(messages),
+            )
+            if winner == "backup":
+                logger.info(f"Hedged request answered by {settings.BACKUP_MODEL_NAME}")
+            return response
         try:
-            return self.backup_llm.invoke(messages)
+            return await self._aprimary(messages, breaker)
         except Exception as e:
-            logger.error(f"Error at generating response: {e}")
-            return AIMessage(content=f"Error at generating response: {e}")
+            logger.warning(f"Model changes from {settings.MODEL_NAME} to {settings.BACKUP_MODEL_NAME} due to error {e}")
+        return await self.backup_llm.ainvoke(messages)
+
+    async def _aprimary(self, messages: list, breaker: circuit_breaker.CircuitBreaker) -> BaseMessage:
+        """
+        Call the primary model, through the endpoint pool when settings.ENDPOINTS is configured,
+        and report the outcome to its circuit breaker
+        """
+        pool = endpoint_pool.get_pool()
+        try:
+            response = await (pool.ainvoke(messages) if pool else self.llm.ainvoke(messages))
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return response
+
+    async def astream(
+            self, query: Union[str, list], cache: bool = True, metrics: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response as text deltas.
+        If the primary model fails before its first token the stream restarts transparently on the backup model;
+        once tokens have been yielded a failure is raised, since the output cannot be taken back.
+        :param query: given query
+        :param cache: whether to serve/store the answer from/in the response caches
+        :param metrics: optional dict filled with "model", "ttft" (seconds to first token) and "total" (seconds)
+        :return: async iterator of text deltas (an error text if both models fail before answering)
+        """
+        metrics = {} if metrics is None else metrics
+        start = time.perf_counter()
+        messages = self._build_messages(query)
+        key, cached = self._lookup(query, messages, cache)
+        if cached is not None:
+            metrics.update(model="cache", ttft=time.perf_counter() - start, total=time.perf_counter() - start)
+            yield cached.content
+            return
+
+        breaker = circuit_breaker.get_breaker(settings.MODEL_NAME)
+        pool = endpoint_pool.get_pool()
+        candidates = []
+        if breaker.allow_request():
+            candidates.append((pool.astream if pool else self.llm.astream, settings.MODEL_NAME, breaker))
+        candidates.append((self.backup_llm.astream, settings.BACKUP_MODEL_NAME, None))
+        error: Optional[Exception] = None
+        for stream, model, model_breaker in candidates:
+            parts: list[str] = []
+            try:
+                async for chunk in stream(messages):
+                    if not chunk.content:
+                        continue
+                    if not parts:
+                        metrics.update(model=model, ttft=time.perf_counter() - start)
+                    parts.append(chunk.content)
+                    yield chunk.content
+            except (asyncio.CancelledError, GeneratorExit):
+                if model_breaker:
+                    model_breaker.release()
+                raise
+            except Exception as e:
+                if model_breaker:
+                    model_breaker.record_failure()
+                if parts:
+                    logger.error(f"Stream of {model} failed after the first token: {e}")
+                    raise
+                logger.warning(f"Stream of {model} failed before the first token ({e}), restarting on backup")
+                error = e
+                continue
+            if model_breaker:
+                model_breaker.record_success()
+            metrics["total"] = time.perf_counter() - start
+            self._store(key, query, cache, AIMessage(content="".join(parts)))
+            return
+        logger.error(f"Error at generating response: {error}")
+        yield f"Error at generating response: {error}"
 
-    def ask_visual(self, query: str, url: str) -> BaseMessage:
+    def ask_visual(self, query: str, url: str, cache: bool = True) -> BaseMessage:
         """
         Generate response based on the system text, given query, and a visual (image) file
         :param query: given query
         :param url: public URL or local path to visual file
+        :param cache: whether to use the response cache
         :return: response, always a BaseMessage (an AIMessage wraps any error)
         """
         if is_url(url):
@@ -80,4 +244,4 @@ class Groq:
             query = visual_path(query, url)
         else:
             return AIMessage(content="Could not find or open the visual URL")
-        return self.ask(query)
\ No newline at end of file
+        return self.ask(query, cache=cache)
\ No newline at end of file
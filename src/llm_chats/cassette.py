@@ -0,0 +1,246 @@
+"""
+Record/replay cassettes for Groq traffic.
+
+With settings.CASSETTE_MODE = "record" every pooled ChatGroq call (Groq.ask/astream as well as the Agent graphs)
+goes to the API as usual and the request key, the response or the streamed chunks (tool calls included) and their
+timing are appended to a gzip-compressed JSON-lines cassette at CASSETTE_PATH. With "replay" the same calls are
+served from the cassette without network access; identical requests are replayed in recorded order.
+CASSETTE_REPLAY_LATENCY re-applies the recorded latencies, otherwise replay runs at full speed.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import operator
+import os
+import threading
+import time
+from functools import reduce
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.messages import (
+    AIMessageChunk,
+    BaseMessage,
+    message_chunk_to_message,
+    messages_from_dict,
+    messages_to_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_groq import ChatGroq
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+
+# how a request is sent, not what it asks: a deadline's remaining time or streaming must not change the key
+_TRANSPORT_KWARGS = frozenset({"timeout", "stream"})
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _canonical_message(message: BaseMessage) -> dict:
+    # ids are left out, LangGraph assigns fresh random ids on every run
+    return {
+        "type": message.type,
+        "content": message.content,
+        "name": getattr(message, "name", None),
+        "tool_calls": [{"name": c["name"], "args": c["args"]} for c in getattr(message, "tool_calls", None) or []],
+    }
+
+
+def request_key(model: str, messages: list[BaseMessage], stop: Optional[list[str]], kwargs: dict) -> str:
+    """
+    Deterministic key of a chat model request
+    :param model: model name
+    :param messages: request messages
+    :param stop: stop sequences
+    :param kwargs: call kwargs, e.g. bound tools and tool_choice; transport kwargs (timeout, stream) are left out
+    :return: hex digest
+    """
+    payload = {
+        "model": model,
+        "messages": [_canonical_message(m) for m in messages],
+        "stop": stop,
+        "kwargs": {k: v for k, v in kwargs.items() if k not in _TRANSPORT_KWARGS},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+
+    def __init__(self, path: str):
+        """
+        Cassette file holding recorded interactions
+        :param path: .jsonl.gz file, appended to in record mode
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict]] = {}
+        self._cursor: dict[str, int] = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as cassette_file:
+                for line in cassette_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def record(self, entry: dict) -> None:
+        """Append an interaction to the cassette."""
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as cassette_file:
+                cassette_file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+
+    def play(self, key: str) -> dict:
+        """Next recorded interaction of a key; the last one repeats once all were played."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"No recorded interaction for request {key[:12]} in {self.path}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Return the process-wide cassette at settings.CASSETTE_PATH."""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(settings.CASSETTE_PATH)
+            get_logger().info(f"Cassette {settings.CASSETTE_MODE} mode on {settings.CASSETTE_PATH}")
+        return _cassette
+
+
+def _dump_result(result: ChatResult) -> dict:
+    return {
+        "messages": messages_to_dict([g.message for g in result.generations]),
+        "generation_info": [g.generation_info for g in result.generations],
+        "llm_output": result.llm_output,
+    }
+
+
+def _load_result(data: dict) -> ChatResult:
+    generations = [
+        ChatGeneration(message=message, generation_info=info)
+        for message, info in zip(messages_from_dict(data["messages"]), data["generation_info"])
+    ]
+    return ChatResult(generations=generations, llm_output=data["llm_output"])
+
+
+def _dump_chunk(chunk: ChatGenerationChunk, offset: float) -> dict:
+    return {
+        "offset": offset,
+        "message": messages_to_dict([chunk.message])[0],
+        "generation_info": chunk.generation_info,
+    }
+
+
+def _load_chunk(data: dict) -> ChatGenerationChunk:
+    return ChatGenerationChunk(
+        message=messages_from_dict([data["message"]])[0],
+        generation_info=data["generation_info"],
+    )
+
+
+def _replay_result(entry: dict) -> ChatResult:
+    """Result of a recorded interaction, merging the chunks if it was recorded as a stream."""
+    if entry["kind"] == "generate":
+        return _load_result(entry["result"])
+    merged = reduce(operator.add, [_load_chunk(c) for c in entry["chunks"]])
+    return ChatResult(generations=[
+        ChatGeneration(message=message_chunk_to_message(merged.message), generation_info=merged.generation_info)
+    ])
+
+
+def _replay_chunks(entry: dict) -> list[tuple[float, ChatGenerationChunk]]:
+    """(offset, chunk) pairs of a recorded interaction, one chunk if it was recorded without streaming."""
+    if entry["kind"] == "stream":
+        return [(c["offset"], _load_chunk(c)) for c in entry["chunks"]]
+    generation = _load_result(entry["result"]).generations[0]
+    message = generation.message
+    chunk = AIMessageChunk(
+        **message.model_dump(exclude={"type", "tool_calls", "invalid_tool_calls"}),
+        tool_call_chunks=[
+            {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+            for i, c in enumerate(getattr(message, "tool_calls", None) or [])
+        ],
+    )
+    return [(entry["latency"], ChatGenerationChunk(message=chunk, generation_info=generation.generation_info))]
+
+
+class CassetteChatGroq(ChatGroq):
+    """ChatGroq that records its traffic to, or replays it from, the cassette depending on CASSETTE_MODE."""
+
+    def _key(self, messages: list[BaseMessage], stop: Optional[list[str]], kwargs: dict) -> str:
+        return request_key(self.model_name, messages, stop, kwargs)
+
+    @staticmethod
+    def _entry(key: str, kind: str, latency: float, **data: Any) -> dict:
+        return {"key": key, "kind": kind, "latency": latency, **data}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        if settings.CASSETTE_MODE == "replay":
+            entry = get_cassette().play(key)
+            if settings.CASSETTE_REPLAY_LATENCY:
+                time.sleep(entry["latency"])
+            return _replay_result(entry)
+        start = time.perf_counter()
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        get_cassette().record(self._entry(key, "generate", time.perf_counter() - start, result=_dump_result(result)))
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        if settings.CASSETTE_MODE == "replay":
+            entry = get_cassette().play(key)
+            if settings.CASSETTE_REPLAY_LATENCY:
+                await asyncio.sleep(entry["latency"])
+            return _replay_result(entry)
+        start = time.perf_counter()
+        result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        get_cassette().record(self._entry(key, "generate", time.perf_counter() - start, result=_dump_result(result)))
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, kwargs)
+        if settings.CASSETTE_MODE == "replay":
+            entry, start = get_cassette().play(key), time.perf_counter()
+            for offset, chunk in _replay_chunks(entry):
+                if settings.CASSETTE_REPLAY_LATENCY:
+                    time.sleep(max(0.0, offset - (time.perf_counter() - start)))
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        start, chunks = time.perf_counter(), []
+        for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(_dump_chunk(chunk, time.perf_counter() - start))
+            yield chunk
+        get_cassette().record(self._entry(key, "stream", time.perf_counter() - start, chunks=chunks))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, kwargs)
+        if settings.CASSETTE_MODE == "replay":
+            entry, start = get_cassette().play(key), time.perf_counter()
+            for offset, chunk in _replay_chunks(entry):
+                if settings.CASSETTE_REPLAY_LATENCY:
+                    await asyncio.sleep(max(0.0, offset - (time.perf_counter() - start)))
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        start, chunks = time.perf_counter(), []
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(_dump_chunk(chunk, time.perf_counter() - start))
+            yield chunk
+        get_cassette().record(self._entry(key, "stream", time.perf_counter() - start, chunks=chunks))
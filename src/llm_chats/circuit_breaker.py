@@ -0,0 +1,121 @@
+"""
+Per-model circuit breakers shared by every Groq instance in the process.
+
+closed    -> requests flow; once the failure rate over the last BREAKER_WINDOW calls reaches
+             BREAKER_FAILURE_RATE (with at least BREAKER_MIN_CALLS calls) the breaker opens.
+open      -> requests skip the model until BREAKER_COOLDOWN seconds have passed.
+half_open -> up to BREAKER_HALF_OPEN_PROBES probe requests test recovery; a success closes the breaker,
+             a failure opens it again for another cooldown.
+"""
+import threading
+import time
+from collections import deque
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+
+    def __init__(
+            self,
+            name: str,
+            failure_rate: float = 0.5,
+            window: int = 20,
+            min_calls: int = 5,
+            cooldown: float = 30.0,
+            half_open_probes: int = 1
+    ):
+        """
+        Create a circuit breaker
+        :param name: name used in logs, usually the model name
+        :param failure_rate: failure share of the window that opens the breaker
+        :param window: number of recent calls the failure rate is computed over
+        :param min_calls: calls needed in the window before the breaker can open
+        :param cooldown: seconds the breaker stays open before probing
+        :param half_open_probes: concurrent probe requests allowed while half open
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    def _transition(self, state: str) -> None:
+        get_logger().warning(f"Circuit breaker of {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats["opened"] += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+        self._probes = 0
+
+    def allow_request(self) -> bool:
+        """
+        Whether a request may go to the model; every allowed request must end with
+        record_success, record_failure or release
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                self.stats["probes"] += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+            elif self.state == CLOSED:
+                self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self.state == CLOSED:
+                self._outcomes.append(False)
+                failures = self._outcomes.count(False)
+                if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                    self._transition(OPEN)
+
+    def release(self) -> None:
+        """End an allowed request without a verdict, e.g. a primary cancelled because its hedge won."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of a model."""
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name=model,
+                failure_rate=settings.BREAKER_FAILURE_RATE,
+                window=settings.BREAKER_WINDOW,
+                min_calls=settings.BREAKER_MIN_CALLS,
+                cooldown=settings.BREAKER_COOLDOWN,
+                half_open_probes=settings.BREAKER_HALF_OPEN_PROBES,
+            )
+            _breakers[model] = breaker
+        return breaker
@@ -0,0 +1,170 @@
+"""
+Process-wide registry of pooled chat clients.
+
+``Groq``, ``Agent`` and ``Chatbot`` borrow their ``ChatGroq`` models from here instead of constructing them, so a
+Streamlit deployment with many sessions shares one client per (model, generation settings) and one explicitly
+sized keep-alive HTTP connection pool (the async pool per event loop, as asyncio connections cannot cross loops:
+the async runner, ``asyncio.run`` in the examples and notebook kernels each get their own). Every pooled client carries the model's rate limiter and the prompt-cache
+accounting, and Groq clients are cassette-backed when settings.CASSETTE_MODE is set.
+"""
+import asyncio
+import threading
+import weakref
+from typing import Callable, Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_groq import ChatGroq
+
+from src.config import settings
+from src.llm_chats import cassette, prompt_cache, rate_limiter
+from src.utils.logging_config import get_logger
+
+try:
+    from langchain_openai import ChatOpenAI
+except ImportError:  # optional, only needed for OpenAI-compatible endpoints (see endpoint_pool.py)
+    ChatOpenAI = None
+
+_lock = threading.Lock()
+_clients: dict[tuple, BaseChatModel] = {}
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _loop_client() -> httpx.AsyncClient:
+    """The async client of the running event loop, created on first use (dropped with its loop)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _loop_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _loop_clients[loop] = httpx.AsyncClient(limits=_limits(), timeout=settings.TIMEOUT)
+            get_logger().debug(f"Async HTTP pool created for loop {id(loop)} ({len(_loop_clients)} loops)")
+        return client
+
+
+class LoopAsyncClient(httpx.AsyncClient):
+    """
+    Async client handle for the chat clients, which are built once but used from several event loops: requests are
+    built here and sent through the pooled client of the loop they run on
+    """
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await _loop_client().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with _lock:
+            client = _loop_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+def http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Return the shared sync and async HTTP clients, creating them on first use
+    :return: (sync client, async client handle, see LoopAsyncClient)
+    """
+    global _http_client, _http_async_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(limits=_limits(), timeout=settings.TIMEOUT)
+        if _http_async_client is None or _http_async_client.is_closed:
+            _http_async_client = LoopAsyncClient(timeout=settings.TIMEOUT)
+        return _http_client, _http_async_client
+
+
+def default_params() -> dict:
+    """Generation settings every pooled client is created with unless overridden."""
+    return dict(
+        temperature=settings.TEMPERATURE,
+        max_tokens=settings.MAX_TOKENS,
+        reasoning_format="parsed" if settings.REASONING else None,
+        timeout=settings.TIMEOUT,
+        max_retries=settings.MAX_RETERIES,
+    )
+
+
+def client_key(model: str, **params) -> tuple:
+    """Registry key of a client: the model name plus its sorted generation settings."""
+    return (model,) + tuple(sorted(params.items()))
+
+
+def get_chat_model(model: str, **overrides) -> ChatGroq:
+    """
+    Borrow the shared ChatGroq client for the given model and generation settings
+    :param model: model name, e.g. settings.MODEL_NAME
+    :param overrides: generation settings that differ from default_params(), or base_url/api_key of another
+    Groq-compatible endpoint (base_url defaults to settings.GROQ_ENDPOINT)
+    :return: pooled ChatGroq instance (shared, do not mutate)
+    """
+    params = dict(default_params(), base_url=settings.GROQ_ENDPOINT, api_key=settings.GROQ_API_KEY)
+    params.update(overrides)
+    chat_class = cassette.CassetteChatGroq if settings.CASSETTE_MODE else ChatGroq
+    return _get_or_create(("groq", settings.CASSETTE_MODE), model, params, lambda sync_client, async_client: chat_class(
+        model=model,
+        http_client=sync_client,
+        http_async_client=async_client,
+        callbacks=[rate_limiter.RateLimitHandler(model), prompt_cache.PromptCacheHandler()],
+        **params,
+    ))
+
+
+def get_openai_chat_model(model: str, base_url: str, api_key: str = "not-needed", **overrides) -> BaseChatModel:
+    """
+    Borrow the shared client of an OpenAI-compatible endpoint (needs the optional langchain-openai package)
+    :param model: model name served by the endpoint
+    :param base_url: API base, e.g. http://localhost:8000/v1
+    :param api_key: API key of the endpoint
+    :param overrides: generation settings that differ from default_params()
+    :return: pooled ChatOpenAI instance (shared, do not mutate)
+    """
+    if ChatOpenAI is None:
+        raise ImportError("OpenAI-compatible endpoints need langchain-openai: pip install langchain-openai")
+    params = default_params()
+    params.pop("reasoning_format")
+    params.update(overrides, base_url=base_url, api_key=api_key)
+    return _get_or_create(("openai",), model, params, lambda sync_client, async_client: ChatOpenAI(
+        model=model,
+        http_client=sync_client,
+        http_async_client=async_client,
+        callbacks=[rate_limiter.RateLimitHandler(model), prompt_cache.PromptCacheHandler()],
+        **params,
+    ))
+
+
+def _get_or_create(kind: tuple, model: str, params: dict, factory: Callable) -> BaseChatModel:
+    """Return the registered client of (kind, model, params), building it with factory(sync, async) if missing"""
+    key = kind + client_key(model, **params)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    sync_client, async_client = http_clients()
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory(sync_client, async_client)
+            _clients[key] = client
+            get_logger().info(f"Pooled client created for {model} ({len(_clients)} in registry)")
+    return client
+
+
+def clear() -> None:
+    """Drop every pooled client and close the shared HTTP connections."""
+    global _http_client, _http_async_client
+    with _lock:
+        _clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        # the async clients are closed by garbage collection, their loops may already be gone
+        _http_async_client = None
+        _loop_clients.clear()
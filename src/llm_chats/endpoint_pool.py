@@ -0,0 +1,245 @@
+"""
+Least-latency load balancing across Groq and OpenAI-compatible endpoints.
+
+Each endpoint keeps an exponentially weighted moving average (EWMA) of its request latency. Requests go to the
+healthy endpoint with the lowest EWMA (endpoints without samples are tried first), a request that fails moves on
+to the next endpoint, and an endpoint that fails ENDPOINT_EJECT_AFTER times in a row is ejected for
+ENDPOINT_EJECT_SECONDS. A background task polls every endpoint's /models route to eject dead endpoints and
+readmit recovered ones.
+
+Endpoints come from settings.ENDPOINTS, for example::
+
+    [{"name": "groq", "kind": "groq"},
+     {"name": "local", "kind": "openai", "base_url": "http://localhost:8000/v1", "model": "llama-3.1-8b"}]
+
+"groq" endpoints use ChatGroq (base_url defaults to GROQ_ENDPOINT or the public API), "openai" endpoints use
+ChatOpenAI from the optional langchain-openai package. "model" defaults to settings.MODEL_NAME.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+
+from src.config import settings
+from src.llm_chats import client_pool
+from src.utils import async_runner
+from src.utils.logging_config import get_logger
+
+
+class Endpoint:
+
+    def __init__(
+            self,
+            name: str,
+            kind: str = "groq",
+            base_url: Optional[str] = None,
+            model: Optional[str] = None,
+            api_key: Optional[str] = None
+    ):
+        """
+        One model endpoint and its health state
+        :param name: name used in logs and stats
+        :param kind: "groq" or "openai"
+        :param base_url: API base, e.g. http://localhost:8000/v1 for an OpenAI-compatible server
+        :param model: model name served by the endpoint
+        :param api_key: API key of the endpoint, defaults to GROQ_API_KEY for groq endpoints
+        """
+        if kind not in ("groq", "openai"):
+            raise ValueError(f"Unknown endpoint kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.base_url = base_url or (settings.GROQ_ENDPOINT if kind == "groq" else None)
+        self.model = model or settings.MODEL_NAME
+        self.api_key = api_key or (settings.GROQ_API_KEY if kind == "groq" else "not-needed")
+        self.ewma: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.stats = {"requests": 0, "failures": 0, "ejections": 0}
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    @property
+    def models_url(self) -> str:
+        """URL of the endpoint's model list, used as health check."""
+        if self.kind == "groq":
+            return (self.base_url or "https://api.groq.com").rstrip("/") + "/openai/v1/models"
+        return self.base_url.rstrip("/") + "/models"
+
+    def chat_model(self) -> BaseChatModel:
+        """Pooled chat model that talks to this endpoint."""
+        if self.kind == "groq":
+            return client_pool.get_chat_model(self.model, base_url=self.base_url, api_key=self.api_key)
+        return client_pool.get_openai_chat_model(self.model, base_url=self.base_url, api_key=self.api_key)
+
+
+class EndpointPool:
+
+    def __init__(
+            self,
+            endpoints: list[Endpoint],
+            alpha: float = 0.3,
+            eject_after: int = 3,
+            eject_seconds: float = 30.0
+    ):
+        """
+        Create a pool of endpoints
+        :param endpoints: endpoints to balance across
+        :param alpha: EWMA weight of the newest latency sample
+        :param eject_after: consecutive failures that eject an endpoint
+        :param eject_seconds: how long an ejected endpoint is skipped
+        """
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.alpha = alpha
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._health_task: Optional[Any] = None
+
+    def ranked(self) -> list[Endpoint]:
+        """Endpoints in routing order: healthy ones by EWMA (unmeasured first), then ejected ones by readmission."""
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.healthy]
+            ejected = [e for e in self.endpoints if not e.healthy]
+            healthy.sort(key=lambda e: -1.0 if e.ewma is None else e.ewma)
+            ejected.sort(key=lambda e: e.ejected_until)
+            return healthy + ejected
+
+    def choose(self) -> Endpoint:
+        """Fastest healthy endpoint."""
+        return self.ranked()[0]
+
+    def record_success(self, endpoint: Endpoint, latency: float) -> None:
+        with self._lock:
+            endpoint.stats["requests"] += 1
+            endpoint.failures = 0
+            endpoint.ejected_until = 0.0
+            endpoint.ewma = latency if endpoint.ewma is None else (
+                    self.alpha * latency + (1 - self.alpha) * endpoint.ewma)
+
+    def record_failure(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.stats["requests"] += 1
+            endpoint.stats["failures"] += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.eject_after and endpoint.healthy:
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                endpoint.stats["ejections"] += 1
+                get_logger().warning(f"Endpoint {endpoint.name} ejected for {self.eject_seconds}s")
+
+    async def ainvoke(self, messages: list) -> BaseMessage:
+        """
+        Send a request to the fastest healthy endpoint, moving on to the next one on failure
+        :param messages: messages to send
+        :return: response of the first endpoint that answered; raises the last error if all failed
+        """
+        error: Optional[Exception] = None
+        for endpoint in self.ranked():
+            start = time.perf_counter()
+            try:
+                response = await endpoint.chat_model().ainvoke(messages)
+            except Exception as e:
+                self.record_failure(endpoint)
+                get_logger().warning(f"Endpoint {endpoint.name} failed: {e}")
+                error = e
+                continue
+            self.record_success(endpoint, time.perf_counter() - start)
+            response.response_metadata["endpoint"] = endpoint.name
+            return response
+        raise error
+
+    async def astream(self, messages: list) -> AsyncIterator[Any]:
+        """
+        Stream from the fastest healthy endpoint, its latency sample being the time to first chunk.
+        A failure before the first chunk moves on to the next endpoint; later failures are raised.
+        :param messages: messages to send
+        :return: async iterator of message chunks
+        """
+        error: Optional[Exception] = None
+        for endpoint in self.ranked():
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in endpoint.chat_model().astream(messages):
+                    if not started:
+                        self.record_success(endpoint, time.perf_counter() - start)
+                        started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self.record_failure(endpoint)
+                get_logger().warning(f"Endpoint {endpoint.name} failed: {e}")
+                error = e
+        raise error
+
+    async def check_health(self) -> None:
+        """Poll every endpoint's model list once, ejecting failing endpoints and readmitting recovered ones."""
+        http_client = client_pool.http_clients()[1]
+
+        async def check(endpoint: Endpoint) -> None:
+            try:
+                response = await http_client.get(
+                    endpoint.models_url,
+                    headers={"Authorization": f"Bearer {endpoint.api_key}"},
+                    timeout=5.0,
+                )
+                response.raise_for_status()
+            except Exception as e:
+                get_logger().warning(f"Health check of endpoint {endpoint.name} failed: {e}")
+                with self._lock:
+                    if endpoint.healthy:
+                        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                        endpoint.stats["ejections"] += 1
+                return
+            with self._lock:
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+
+        await asyncio.gather(*(check(e) for e in self.endpoints))
+
+    def start_health_checks(self, interval: float) -> None:
+        """Run check_health every interval seconds on the shared background loop."""
+        if self._health_task is not None or interval <= 0:
+            return
+
+        async def loop() -> None:
+            while True:
+                await self.check_health()
+                await asyncio.sleep(interval)
+
+        self._health_task = async_runner.submit(loop())
+
+    def stop_health_checks(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+
+_pool: Optional[EndpointPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[EndpointPool]:
+    """Return the process-wide endpoint pool, None when settings.ENDPOINTS is empty."""
+    global _pool
+    if not settings.ENDPOINTS:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = EndpointPool(
+                [Endpoint(**config) for config in settings.ENDPOINTS],
+                alpha=settings.ENDPOINT_EWMA_ALPHA,
+                eject_after=settings.ENDPOINT_EJECT_AFTER,
+                eject_seconds=settings.ENDPOINT_EJECT_SECONDS,
+            )
+            _pool.start_health_checks(settings.ENDPOINT_HEALTH_INTERVAL)
+            get_logger().info(f"Endpoint pool created with {[e.name for e in _pool.endpoints]}")
+        return _pool
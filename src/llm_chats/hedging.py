@@ -0,0 +1,134 @@
+"""
+Hedged requests between the primary and the backup model.
+
+The primary request starts immediately. If it has not answered within a delay derived from the recent primary
+latency percentile (p95 by default), the same request is sent to the backup model and whichever finishes first
+wins; the loser is cancelled. A primary that fails before the delay falls back to the backup right away. When the
+backup wins, the time the primary had taken so far is recorded as its (censored) latency, so a slowing primary
+raises the delay instead of only its fast answers being sampled.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+
+class LatencyTracker:
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Rolling window of successful request latencies
+        :param window: number of latencies kept
+        :param min_samples: samples needed before the percentile is trusted
+        """
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """
+        Latency percentile of the window
+        :param q: percentile in [0, 100]
+        :return: latency in seconds, None while there are fewer than min_samples samples
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+primary_latency = LatencyTracker(window=settings.HEDGE_WINDOW)
+stats = {"requests": 0, "hedged": 0, "primary_wins": 0, "hedge_wins": 0, "fallbacks": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        stats[name] += 1
+
+
+def hedge_delay() -> float:
+    """Seconds to wait for the primary before hedging: the latency percentile clamped to the configured bounds."""
+    observed = primary_latency.percentile(settings.HEDGE_PERCENTILE)
+    if observed is None:
+        return settings.HEDGE_INITIAL_DELAY
+    return min(max(observed, settings.HEDGE_MIN_DELAY), settings.HEDGE_MAX_DELAY)
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+async def hedged(
+        primary: Callable[[], Awaitable[Any]],
+        backup: Callable[[], Awaitable[Any]],
+        delay: float | None = None
+) -> tuple[Any, str]:
+    """
+    Run a request hedged between two models
+    :param primary: factory of the primary request coroutine
+    :param backup: factory of the backup request coroutine
+    :param delay: seconds before the backup is fired, defaults to hedge_delay()
+    :return: result and the winner ("primary" or "backup"); raises the backup's error if both fail
+    """
+    delay = hedge_delay() if delay is None else delay
+    _count("requests")
+    start = time.perf_counter()
+    primary_task = asyncio.create_task(primary())
+    pending = {primary_task}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            try:
+                result = primary_task.result()
+            except Exception as e:
+                get_logger().warning(f"Primary failed before hedging ({e}), falling back to backup")
+                _count("fallbacks")
+                return await backup(), "backup"
+            primary_latency.record(time.perf_counter() - start)
+            _count("primary_wins")
+            return result, "primary"
+
+        _count("hedged")
+        pending.add(asyncio.create_task(backup()))
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                if task is primary_task:
+                    primary_latency.record(time.perf_counter() - start)
+                    _count("primary_wins")
+                    return task.result(), "primary"
+                if not primary_task.done():
+                    # censored: the primary took at least this long
+                    primary_latency.record(time.perf_counter() - start)
+                _count("hedge_wins")
+                return task.result(), "backup"
+        raise error
+    finally:
+        # cancel the loser, or both requests if the caller itself was cancelled
+        for task in pending:
+            await _cancel(task)
+
+
+def hedge_win_rate() -> float:
+    """Share of hedged requests that the backup model won."""
+    with _stats_lock:
+        return stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
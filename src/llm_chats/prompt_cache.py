@@ -0,0 +1,90 @@
+"""
+Prompt-prefix-stable message assembly and provider prompt-cache accounting.
+
+Groq (like most providers) caches the longest previously seen prompt prefix, so requests should start with
+byte-identical content for as long as possible: the system prompt with its tool manifest is built once per bot and
+never re-formatted, tools are bound in a deterministic order, and the history window only moves in steps (see
+CONTEXT_TRIM_RATIO in agents_utils/context_window.py) so consecutive turns append to an unchanged prefix.
+
+A callback handler on every pooled client adds the cached prompt tokens reported in usage_metadata to ``stats``,
+so the effect can be checked with ``cached_ratio()``.
+"""
+import threading
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.utils.logging_config import get_logger
+
+_stats_lock = threading.Lock()
+stats = {"requests": 0, "input_tokens": 0, "cached_tokens": 0}
+
+
+def stable_tools(tools: list) -> list:
+    """Tools in a deterministic order (by name), so their bound schemas are identical across sessions."""
+    return sorted(tools, key=lambda t: getattr(t, "name", str(t)))
+
+
+def static_system_text(system_text: str, tools: Optional[list] = None) -> str:
+    """
+    The static part of every request: the system prompt followed by a single tool manifest
+    :param system_text: system prompt
+    :param tools: tools bound to the model
+    :return: system text, identical for every turn and session of the same bot
+    """
+    system_text = system_text.strip()
+    names = [getattr(t, "name", None) for t in tools or []]
+    if any(names):
+        system_text += f"\n**AVAILABLE Tools**: {sorted(n for n in names if n)}"
+    return system_text
+
+
+def system_message(system_text: str) -> dict:
+    """System message in the one shape every caller sends it, so equal prompts serialize to equal bytes."""
+    return {"role": "system", "content": system_text}
+
+
+def assemble(system_text: str, history: list) -> list:
+    """
+    Request messages: the static system message, then the history window in order
+    :param system_text: output of static_system_text()
+    :param history: history window, oldest first (summary included)
+    :return: messages to send
+    """
+    return [system_message(system_text)] + list(history)
+
+
+def _usage(response: LLMResult) -> Optional[dict]:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    return None
+
+
+def record(usage: dict) -> None:
+    """Add the input and cached tokens of one usage_metadata dict to stats."""
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    with _stats_lock:
+        stats["requests"] += 1
+        stats["input_tokens"] += usage.get("input_tokens", 0)
+        stats["cached_tokens"] += cached
+    get_logger().debug(f"Prompt cache: {cached}/{usage.get('input_tokens', 0)} input tokens cached")
+
+
+def cached_ratio() -> float:
+    """Share of prompt tokens served from the provider's prompt cache since start."""
+    with _stats_lock:
+        return stats["cached_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0
+
+
+class PromptCacheHandler(AsyncCallbackHandler):
+    """Callback handler that records the prompt-cache usage of every chat model call it is attached to."""
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = _usage(response)
+        if usage:
+            record(usage)
@@ -0,0 +1,168 @@
+"""
+Process-wide token-bucket rate limiting against Groq's per-minute quotas.
+
+Each model gets one limiter with a requests-per-minute bucket and a tokens-per-minute bucket. Before a call the
+limiter takes one request and the estimated prompt tokens, waiting (instead of failing with a 429) until both
+buckets can pay. When the response arrives the token charge is reconciled with the actual token_usage.
+
+The limiter is attached to the pooled ChatGroq clients as a callback handler, so it covers Groq.ask as well as
+the Agent graphs that call the clients directly. Limits come from settings.RATE_LIMITS per model, falling back to
+RATE_LIMIT_RPM / RATE_LIMIT_TPM; a limit of 0 disables that bucket.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from src.config import settings
+from src.utils import token_count
+from src.utils.logging_config import get_logger
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute: int):
+        """
+        Bucket holding up to per_minute units and refilling continuously at per_minute / 60 per second
+        :param per_minute: quota per minute
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (amount < 0) or charge extra (amount > 0) units; the level may go negative."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0):
+        """
+        Limiter for one model
+        :param name: model name used in logs
+        :param rpm: requests per minute, 0 disables the request bucket
+        :param tpm: tokens per minute, 0 disables the token bucket
+        """
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "queued": 0, "waited_seconds": 0.0}
+
+    def _wait_time(self, estimated_tokens: int) -> float:
+        now = time.monotonic()
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+        if wait == 0.0:
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(estimated_tokens)
+        return wait
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """
+        Wait until one request and the estimated tokens fit the quotas, then charge them
+        :param estimated_tokens: estimated prompt tokens of the call
+        """
+        queued_at = time.monotonic()
+        while True:
+            with self._lock:
+                wait = self._wait_time(estimated_tokens)
+            if wait == 0.0:
+                break
+            await asyncio.sleep(wait)
+        waited = time.monotonic() - queued_at
+        with self._lock:
+            self.stats["acquired"] += 1
+            if waited > 0.001:
+                self.stats["queued"] += 1
+                self.stats["waited_seconds"] += waited
+        if waited > 1.0:
+            get_logger().info(f"Rate limiter of {self.name} queued a call for {waited:.1f}s")
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Replace the estimated token charge with the actual usage reported by the provider."""
+        if self.tokens:
+            with self._lock:
+                self.tokens.adjust(actual_tokens - min(estimated_tokens, self.tokens.capacity))
+
+
+_limiters: dict[str, Optional[RateLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model: str) -> Optional[RateLimiter]:
+    """Return the process-wide limiter of a model, None when the model has no limits configured."""
+    with _limiters_lock:
+        if model not in _limiters:
+            limits = settings.RATE_LIMITS.get(model, {})
+            rpm = limits.get("rpm", settings.RATE_LIMIT_RPM)
+            tpm = limits.get("tpm", settings.RATE_LIMIT_TPM)
+            _limiters[model] = RateLimiter(model, rpm=rpm, tpm=tpm) if rpm > 0 or tpm > 0 else None
+        return _limiters[model]
+
+
+def _actual_tokens(response: LLMResult) -> Optional[int]:
+    """Total tokens of a response, from usage_metadata or the token_usage of the llm output."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("total_tokens")
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("total_tokens")
+
+
+class RateLimitHandler(AsyncCallbackHandler):
+    """Callback handler that applies the model's limiter to every chat model call it is attached to."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._pending: dict[UUID, int] = {}
+
+    async def on_chat_model_start(
+            self, serialized: dict[str, Any], messages: list[list[BaseMessage]], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        limiter = get_limiter(self.model)
+        if limiter is None:
+            return
+        estimate = sum(token_count.count_messages(m) for m in messages)
+        self._pending[run_id] = estimate
+        await limiter.acquire(estimate)
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        estimate = self._pending.pop(run_id, None)
+        limiter = get_limiter(self.model)
+        if estimate is None or limiter is None:
+            return
+        actual = _actual_tokens(response)
+        if actual is not None:
+            limiter.reconcile(estimate, actual)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # the request still counts against the quota, keep the estimated charge
+        self._pending.pop(run_id, None)
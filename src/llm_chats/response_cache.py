@@ -0,0 +1,197 @@
+"""
+Exact-match response cache for LLM calls.
+
+Responses are keyed on a canonical hash of (model, temperature, max_tokens, messages). A bounded in-memory LRU
+sits in front of a persistent SQLite store; both tiers honour the same TTL and the SQLite tier is trimmed to a
+maximum size by evicting the least recently used rows.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+
+def _canonical_message(message: Any) -> Any:
+    """Reduce a message (tuple, dict or BaseMessage) to plain JSON-able data."""
+    if isinstance(message, BaseMessage):
+        return {"role": message.type, "content": message.content}
+    if isinstance(message, tuple):
+        return list(message)
+    return message
+
+
+def make_key(model: str, temperature: float, max_tokens: int, messages: list) -> str:
+    """
+    Canonical hash of a request
+    :param model: model name
+    :param temperature: sampling temperature
+    :param max_tokens: generation limit
+    :param messages: messages sent to the model
+    :return: hex digest used as cache key
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": [_canonical_message(m) for m in messages],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _dump(message: BaseMessage) -> str:
+    return json.dumps({
+        "content": message.content,
+        "additional_kwargs": message.additional_kwargs,
+        "response_metadata": message.response_metadata,
+    }, ensure_ascii=False, default=str)
+
+
+def _load(raw: str, tier: str) -> AIMessage:
+    data = json.loads(raw)
+    metadata = dict(data.get("response_metadata") or {})
+    # cached answers cost no tokens, so drop the usage of the original call
+    metadata.pop("token_usage", None)
+    metadata["cache"] = tier
+    return AIMessage(
+        content=data["content"],
+        additional_kwargs=data.get("additional_kwargs") or {},
+        response_metadata=metadata,
+    )
+
+
+class ResponseCache:
+
+    def __init__(
+            self,
+            path: str,
+            ttl: float = 3600.0,
+            memory_items: int = 512,
+            max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Create the two-tier cache
+        :param path: SQLite file of the persistent tier, ":memory:" keeps it in memory only
+        :param ttl: seconds an entry stays valid, <= 0 disables expiry
+        :param memory_items: capacity of the in-memory LRU
+        :param max_bytes: maximum payload size kept in the SQLite tier
+        """
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        """
+        Look a response up, memory first then SQLite
+        :param key: key from make_key
+        :return: cached AIMessage or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return _load(entry[1], "memory")
+                del self._memory[key]
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, row[1], row[0])
+            self.stats["disk_hits"] += 1
+            return _load(row[0], "disk")
+
+    def put(self, key: str, message: BaseMessage) -> None:
+        """
+        Store a response in both tiers
+        :param key: key from make_key
+        :param message: response to cache
+        """
+        now = time.time()
+        raw = _dump(message)
+        with self._lock:
+            self._remember(key, now, raw)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, raw, len(raw.encode("utf-8")), now, now),
+            )
+            self._trim_disk()
+            self._db.commit()
+            self.stats["stores"] += 1
+
+    def _remember(self, key: str, created: float, raw: str) -> None:
+        self._memory[key] = (created, raw)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _trim_disk(self) -> None:
+        """Evict least recently used rows until the SQLite tier fits max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide response cache configured by settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path=settings.RESPONSE_CACHE_PATH,
+                ttl=settings.RESPONSE_CACHE_TTL,
+                memory_items=settings.RESPONSE_CACHE_MEMORY_ITEMS,
+                max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+            )
+            get_logger().info(f"Response cache opened at {settings.RESPONSE_CACHE_PATH}")
+        return _cache
@@ -0,0 +1,198 @@
+"""
+Local semantic response cache for near-duplicate queries.
+
+Queries are embedded on the CPU with a hashing vectorizer (word unigrams/bigrams plus character trigrams, no model
+download and no network) and kept as rows of a NumPy matrix per namespace. A lookup is a single matrix product
+followed by a top-1 over the cosine similarities; the cached answer is returned when it clears the threshold.
+
+Only standalone queries (no earlier turns in the window) are cached, since a follow-up such as "tell me more"
+means nothing without its history, and time-sensitive queries (time, weather, news, ...) are never cached.
+"""
+import hashlib
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from src.config import settings
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are at be can could do does for from how i in is it me my of on or please s the to "
+    "was what whats which who why will with would you your".split()
+)
+
+
+class HashingVectorizer:
+
+    def __init__(self, dim: int = 4096):
+        """
+        Stateless feature-hashing vectorizer
+        :param dim: number of hashed features
+        """
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = [w for w in _TOKEN.findall(text.lower()) if w not in _STOPWORDS]
+        features = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            features += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return features
+
+    def transform(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed texts as L2-normalised rows
+        :param texts: texts to embed
+        :return: float32 matrix of shape (len(texts), dim)
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class SemanticCache:
+
+    def __init__(self, threshold: float = 0.9, capacity: int = 2048, ttl: float = 3600.0, dim: int = 4096):
+        """
+        Create a semantic cache for one namespace
+        :param threshold: minimum cosine similarity of a hit
+        :param capacity: maximum number of cached queries, the oldest rows are overwritten first
+        :param ttl: seconds an answer stays valid, <= 0 disables expiry
+        :param dim: vectorizer dimension
+        """
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.vectorizer = HashingVectorizer(dim)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._answers: list[Optional[str]] = [None] * capacity
+        self._created = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def lookup_many(self, queries: list[str]) -> list[Optional[str]]:
+        """
+        Batched top-1 lookup
+        :param queries: query texts
+        :return: cached answer per query, None where nothing clears the threshold
+        """
+        if not queries:
+            return []
+        vectors = self.vectorizer.transform(queries)
+        with self._lock:
+            if self._size == 0:
+                self.stats["misses"] += len(queries)
+                return [None] * len(queries)
+            scores = vectors @ self._vectors[:self._size].T
+            if self.ttl > 0:
+                scores[:, time.time() - self._created[:self._size] > self.ttl] = -1.0
+            best = scores.argmax(axis=1)
+            results = []
+            for row, col in enumerate(best):
+                if scores[row, col] >= self.threshold:
+                    results.append(self._answers[col])
+                    self.stats["hits"] += 1
+                else:
+                    results.append(None)
+                    self.stats["misses"] += 1
+            return results
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Top-1 lookup of a single query."""
+        return self.lookup_many([query])[0]
+
+    def put(self, query: str, answer: str) -> None:
+        """
+        Cache the answer of a query
+        :param query: query text
+        :param answer: answer text
+        """
+        vector = self.vectorizer.transform([query])[0]
+        with self._lock:
+            self._vectors[self._next] = vector
+            self._answers[self._next] = answer
+            self._created[self._next] = time.time()
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.stats["stores"] += 1
+
+
+def is_time_sensitive(query: str) -> bool:
+    """Whether the answer to a query is likely to go stale (time, weather, news, ...)."""
+    words = set(_TOKEN.findall(query.lower()))
+    return bool(words & set(settings.SEMANTIC_CACHE_EXCLUDE))
+
+
+def standalone_query(messages: list) -> Optional[str]:
+    """
+    Text of a request that carries no earlier conversation
+    :param messages: history window (without system message) or a plain query string
+    :return: query text, None when the request has history or non-text content
+    """
+    if isinstance(messages, str):
+        return messages
+    if len(messages) != 1:
+        return None
+    message = messages[0]
+    if isinstance(message, dict) and message.get("role") == "user" and isinstance(message.get("content"), str):
+        return message["content"]
+    return None
+
+
+def namespace_of(system_text: str, namespace: Optional[str] = None) -> str:
+    """Explicit namespace if given, otherwise a short hash of the system prompt, so each bot gets its own cache."""
+    return namespace or hashlib.sha256(system_text.encode("utf-8")).hexdigest()[:16]
+
+
+_caches: dict[str, SemanticCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace: str) -> SemanticCache:
+    """Return the process-wide semantic cache of a namespace."""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = SemanticCache(
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                capacity=settings.SEMANTIC_CACHE_CAPACITY,
+                ttl=settings.SEMANTIC_CACHE_TTL,
+            )
+            _caches[namespace] = cache
+        return cache
+
+
+def lookup(namespace: str, messages: list) -> Optional[str]:
+    """
+    Semantic lookup of a request, honouring the opt-in setting and the exclusions
+    :param namespace: cache namespace (see namespace_of)
+    :param messages: history window or query string
+    :return: cached answer or None
+    """
+    if not settings.SEMANTIC_CACHE:
+        return None
+    query = standalone_query(messages)
+    if query is None or is_time_sensitive(query):
+        return None
+    return get_cache(namespace).lookup(query)
+
+
+def store(namespace: str, messages: list, answer: str) -> None:
+    """Cache the answer of a request if it is eligible for semantic caching."""
+    if not settings.SEMANTIC_CACHE or not isinstance(answer, str) or not answer:
+        return
+    query = standalone_query(messages)
+    if query is None or is_time_sensitive(query):
+        return
+    get_cache(namespace).put(query, answer)
@@ -3,17 +3,20 @@ import easyocr
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_core.tools import StructuredTool
 
+from src.agents_utils import request_budget, tool_execution
 from src.config import logger
 
 
 def extract_page(page_data):
-    """Extract text from a single page"""
-    page, page_num, reader, include_OCR = page_data
+    """Extract text from a single page, OCR only while the request deadline has not passed"""
+    page, page_num, reader, include_OCR, budget = page_data
     try:
         text = page.get_text("text")
         result = f"\n--- Page {page_num + 1} (Embedded Text) ---\n{text}"
 
-        if include_OCR:
+        if include_OCR and budget is not None and budget.expired():
+            result += f"\n--- Page {page_num + 1}: OCR skipped, out of time ---\n"
+        elif include_OCR:
             pix = page.get_pixmap(dpi=300)
             img_bytes = pix.tobytes("png")
             ocr_results = reader.readtext(img_bytes, detail=0)
@@ -40,8 +43,9 @@ def extract_text_with_easyocr(pdf_path, lang_list=None, include_OCR: bool = True
         reader = easyocr.Reader(list(lang_list)) if include_OCR else None
         doc = fitz.open(fr"{str(pdf_path)}")
         num_pages = len(doc)
-        # Extract pages in parallel using map
-        page_data = [(doc[i], i, reader, include_OCR) for i in range(doc.page_count)]
+        # Extract pages in parallel using map; the worker threads do not inherit the request budget, pass it along
+        budget = request_budget.current()
+        page_data = [(doc[i], i, reader, include_OCR, budget) for i in range(doc.page_count)]
 
         with ThreadPoolExecutor(max_workers=2) as executor:
             results = list(executor.map(extract_page, page_data))
@@ -56,4 +60,7 @@ def extract_text_with_easyocr(pdf_path, lang_list=None, include_OCR: bool = True
 
 
 def get_tool() -> StructuredTool:
-    return StructuredTool.from_function(extract_text_with_easyocr)
\ No newline at end of file
+    # OCR is CPU and memory heavy, run one document at a time
+    return tool_execution.configure(
+        StructuredTool.from_function(extract_text_with_easyocr), max_concurrency=1, timeout=300
+    )
\ No newline at end of file
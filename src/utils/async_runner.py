@@ -0,0 +1,51 @@
+"""
+Process-wide background event loop.
+
+Pooled async HTTP connections belong to the event loop that opened them, while ``asyncio.run`` creates and closes
+a new loop on every call. Synchronous callers (App, Streamlit sessions) submit their coroutines here instead, so
+every request runs on the same long-lived loop and reuses the same keep-alive connections.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting its thread on first use."""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True).start()
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """
+    Schedule a coroutine on the shared loop without waiting for it
+    :param coro: coroutine to run
+    :return: concurrent future of the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared loop and block until it finishes
+    :param coro: coroutine to run
+    :param timeout: optional number of seconds to wait for the result
+    :return: result of the coroutine
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("async_runner.run() cannot block the runner loop itself; await the coroutine instead")
+    return submit(coro).result(timeout)
@@ -0,0 +1,28 @@
+"""
+Bounded-concurrency helpers for running many independent requests over asyncio.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable
+
+
+async def map_concurrent(
+        func: Callable[[Any], Awaitable[Any]],
+        items: Iterable[Any],
+        max_concurrency: int = 8
+) -> list[Any]:
+    """
+    Await func(item) for every item with at most max_concurrency calls in flight
+    :param func: coroutine function applied to each item
+    :param items: inputs
+    :param max_concurrency: concurrency cap
+    :return: results in input order; an item that raised holds its exception instead of a result
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(item: Any) -> Any:
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
@@ -1,7 +1,8 @@
-import base64
 from urllib.parse import urlparse
 import os
 
+from src.utils.image_preprocessing import to_data_url
+
 
 def is_url(path: str) -> bool:
     if not path:
@@ -40,19 +41,14 @@ def visual_public_url(query: str, url: str) -> list:
     ]
 
 
-def encode_image(image_path):
-  with open(image_path, "rb") as image_file:
-    return base64.b64encode(image_file.read()).decode('utf-8')
-
-
 def visual_path(query: str, path: str) -> list:
     """
-    Create a message for payload to process local visual files
+    Create a message for payload to process local visual files.
+    The image is downscaled and re-encoded first (see image_preprocessing.to_data_url).
     :param query: User query
     :param path: path to the visual file
     :return: created message list
     """
-    base64_image = encode_image(path)
     return [
         {
             "role": "user",
@@ -64,7 +60,7 @@ def visual_path(query: str, path: str) -> list:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}",
+                        "url": to_data_url(path),
                     }
                 }
             ]
@@ -0,0 +1,88 @@
+"""
+Transforms applied to the conversation history before it is sent to the model.
+"""
+import hashlib
+import threading
+from typing import Any, Callable, Optional
+
+from langchain_core.messages import BaseMessage
+
+from src.utils.token_count import IMAGE_TOKENS
+
+_descriptions: dict[str, str] = {}
+_descriptions_lock = threading.Lock()
+stats = {"images_replaced": 0, "bytes_saved": 0, "estimated_tokens_saved": 0}
+
+
+def image_id(url: str) -> str:
+    """Short content hash of an image payload (data URL or public URL)."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+
+
+def _image_url(part: Any) -> Optional[str]:
+    if isinstance(part, dict) and part.get("type") == "image_url":
+        image_url = part.get("image_url")
+        return image_url.get("url") if isinstance(image_url, dict) else image_url
+    return None
+
+
+def _content(message: Any) -> Any:
+    return message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+
+
+def _with_content(message: Any, content: list) -> Any:
+    if isinstance(message, BaseMessage):
+        return message.model_copy(update={"content": content})
+    return {**message, "content": content}
+
+
+def _reference(url: str, describe: Optional[Callable[[str], str]]) -> str:
+    """Text that stands in for an older copy of an image, a cached description when a describer is given."""
+    key = image_id(url)
+    if describe is not None:
+        with _descriptions_lock:
+            description = _descriptions.get(key)
+        if description is None:
+            try:
+                description = describe(url)
+            except Exception:
+                description = ""
+            with _descriptions_lock:
+                _descriptions[key] = description
+        if description:
+            return f"[image {key}, sent again later in the conversation: {description}]"
+    return f"[image {key}, sent again later in the conversation]"
+
+
+def dedupe_images(messages: list, describe: Optional[Callable[[str], str]] = None) -> list:
+    """
+    Keep only the newest copy of every image in the history; older copies become a short text reference
+    :param messages: history as dicts or BaseMessages, oldest first (not modified)
+    :param describe: optional callable url -> short description, called at most once per image
+    :return: history with duplicate image payloads replaced
+    """
+    seen: set[str] = set()
+    result = list(messages)
+    for index in range(len(result) - 1, -1, -1):
+        content = _content(result[index])
+        if not isinstance(content, list):
+            continue
+        new_content, changed = [], False
+        for part in content:
+            url = _image_url(part)
+            if url is None:
+                new_content.append(part)
+                continue
+            key = image_id(url)
+            if key not in seen:
+                seen.add(key)
+                new_content.append(part)
+                continue
+            new_content.append({"type": "text", "text": _reference(url, describe)})
+            changed = True
+            stats["images_replaced"] += 1
+            stats["bytes_saved"] += len(url)
+            stats["estimated_tokens_saved"] += IMAGE_TOKENS
+        if changed:
+            result[index] = _with_content(result[index], new_content)
+    return result
@@ -0,0 +1,87 @@
+"""
+Image preprocessing for visual payloads.
+
+Local images are decoded once, downscaled so their longest side fits IMAGE_MAX_SIDE (larger images only cost
+upload time and vision tokens), re-encoded to IMAGE_FORMAT at IMAGE_QUALITY and returned as a data URL with the
+real MIME type. Results are cached by content hash, so the same image is not processed again on every turn. Files
+Pillow cannot decode are sent as they are, with the MIME type of their extension, and left to the model to reject.
+"""
+import base64
+import hashlib
+import io
+import mimetypes
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+from src.config import settings
+from src.utils.logging_config import get_logger
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+_cache: OrderedDict[str, str] = OrderedDict()
+_cache_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "bytes_in": 0, "bytes_out": 0, "undecodable": 0}
+
+
+def preprocess(data: bytes, max_side: int, fmt: str = "JPEG", quality: int = 85) -> tuple[bytes, str]:
+    """
+    Downscale and re-encode an image
+    :param data: encoded image bytes
+    :param max_side: maximum length of the longest side in pixels
+    :param fmt: output format understood by Pillow, e.g. "JPEG" or "WEBP"
+    :param quality: encoder quality (1-100)
+    :return: encoded bytes and their MIME type; the original bytes if re-encoding would not make them smaller
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        original_format = image.format
+        needs_resize = max(image.size) > max_side
+        image = ImageOps.exif_transpose(image)
+        if needs_resize:
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if fmt == "JPEG" and image.mode != "RGB":
+            # JPEG has no alpha channel, flatten transparent pixels onto white
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt, quality=quality, optimize=True)
+    encoded = buffer.getvalue()
+    if not needs_resize and len(encoded) >= len(data) and original_format in _MIME_TYPES:
+        return data, _MIME_TYPES[original_format]
+    return encoded, _MIME_TYPES.get(fmt, f"image/{fmt.lower()}")
+
+
+def to_data_url(path: str) -> str:
+    """
+    Preprocessed data URL of a local image, cached by content hash and processing settings
+    :param path: path to the image file
+    :return: data:<mime>;base64,... URL
+    """
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    key = hashlib.sha256(data).hexdigest() + f":{settings.IMAGE_MAX_SIDE}:{settings.IMAGE_FORMAT}:{settings.IMAGE_QUALITY}"
+    with _cache_lock:
+        url = _cache.get(key)
+        if url is not None:
+            _cache.move_to_end(key)
+            stats["hits"] += 1
+            return url
+    try:
+        encoded, mime = preprocess(data, settings.IMAGE_MAX_SIDE, settings.IMAGE_FORMAT, settings.IMAGE_QUALITY)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # not an image Pillow can read (UnidentifiedImageError is an OSError): send the raw bytes like before
+        get_logger().warning(f"Could not preprocess image {path}: {e}")
+        encoded, mime = data, mimetypes.guess_type(path)[0] or "application/octet-stream"
+        with _cache_lock:
+            stats["undecodable"] += 1
+    url = f"data:{mime};base64,{base64.b64encode(encoded).decode('ascii')}"
+    with _cache_lock:
+        stats["misses"] += 1
+        stats["bytes_in"] += len(data)
+        stats["bytes_out"] += len(encoded)
+        _cache[key] = url
+        while len(_cache) > settings.IMAGE_CACHE_ITEMS:
+            _cache.popitem(last=False)
+    return url
@@ -0,0 +1,134 @@
+"""
+Typed events of a streamed agent run.
+
+``graph_events`` turns the ("messages", "updates") stream of a create_agent graph into a small set of slotted event
+objects that the UI, the metrics layer or an HTTP handler can forward as they arrive:
+
+* ``TokenDelta``  - a piece of model output text
+* ``ToolStart``   - the model asked for a tool call
+* ``ToolEnd``     - a tool call finished, with its duration and status
+* ``Usage``       - token usage of one model call
+* ``Final``       - the final answer (always the last event)
+
+Events are created once per chunk with no per-chunk logging or string formatting.
+"""
+import time
+from typing import Any, AsyncIterator, Optional, Union
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+
+class TokenDelta:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"TokenDelta({self.text!r})"
+
+
+class ToolStart:
+    __slots__ = ("name", "call_id", "args")
+
+    def __init__(self, name: str, call_id: str, args: dict):
+        self.name = name
+        self.call_id = call_id
+        self.args = args
+
+    def __repr__(self) -> str:
+        return f"ToolStart({self.name!r}, {self.args!r})"
+
+
+class ToolEnd:
+    __slots__ = ("name", "call_id", "content", "status", "duration")
+
+    def __init__(self, name: str, call_id: str, content: Any, status: str, duration: Optional[float]):
+        self.name = name
+        self.call_id = call_id
+        self.content = content
+        self.status = status
+        self.duration = duration  # seconds since the matching ToolStart
+
+    def __repr__(self) -> str:
+        return f"ToolEnd({self.name!r}, {self.status!r}, {self.duration})"
+
+
+class Usage:
+    __slots__ = ("input_tokens", "output_tokens", "cached_tokens")
+
+    def __init__(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cached_tokens = cached_tokens
+
+    def __repr__(self) -> str:
+        return f"Usage(in={self.input_tokens}, out={self.output_tokens}, cached={self.cached_tokens})"
+
+
+class Final:
+    __slots__ = ("content", "messages")
+
+    def __init__(self, content: str, messages: Optional[list] = None):
+        self.content = content
+        self.messages = messages  # updated history, filled in by the Agent
+
+    def __repr__(self) -> str:
+        return f"Final({self.content!r})"
+
+
+Event = Union[TokenDelta, ToolStart, ToolEnd, Usage, Final]
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "\n".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return str(content)
+
+
+def _usage(message: AIMessage) -> Optional[Usage]:
+    usage = message.usage_metadata
+    if not usage:
+        return None
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    return Usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached)
+
+
+async def graph_events(stream: AsyncIterator[tuple[str, Any]]) -> AsyncIterator[Event]:
+    """
+    Typed events of a create_agent run
+    :param stream: graph.astream(..., stream_mode=["messages", "updates"])
+    :return: async iterator of events, Final last
+    """
+    started: dict[str, float] = {}
+    final = ""
+    # outputs of the last model turn's tool calls, in call order; the answer if the run ends on them (return_direct)
+    call_order: list[str] = []
+    results: dict[str, Any] = {}
+    async for mode, data in stream:
+        if mode == "messages":
+            chunk = data[0]
+            if type(chunk) is AIMessageChunk and chunk.content and isinstance(chunk.content, str):
+                yield TokenDelta(chunk.content)
+            continue
+        for update in data.values():
+            for message in (update or {}).get("messages", ()) if isinstance(update, dict) else ():
+                if isinstance(message, AIMessage):
+                    usage = _usage(message)
+                    if usage is not None:
+                        yield usage
+                    now = time.perf_counter()
+                    call_order, results = [c["id"] for c in message.tool_calls], {}
+                    for call in message.tool_calls:
+                        started[call["id"]] = now
+                        yield ToolStart(call["name"], call["id"], call["args"])
+                    if not message.tool_calls and isinstance(message.content, str):
+                        final = message.content
+                elif isinstance(message, ToolMessage):
+                    start = started.pop(message.tool_call_id, None)
+                    duration = None if start is None else time.perf_counter() - start
+                    results[message.tool_call_id] = message.content
+                    yield ToolEnd(message.name, message.tool_call_id, message.content, message.status, duration)
+    if call_order and results:
+        final = "\n\n".join(_text(results[i]) for i in call_order if i in results)
+    yield Final(final)
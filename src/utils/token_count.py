@@ -0,0 +1,56 @@
+"""
+Local, dependency-free token estimates.
+
+Roughly four characters per token for text plus a small per-message overhead, which is close enough for
+budgeting and rate limiting; the provider's token_usage stays the source of truth.
+"""
+from typing import Any
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4  # role and separators
+IMAGE_TOKENS = 1024  # flat estimate per attached image
+
+
+def count_text(text: str) -> int:
+    """Estimated tokens of a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def count_content(content: Any) -> int:
+    """Estimated tokens of a message content: a string or a list of text/image parts."""
+    if isinstance(content, str):
+        return count_text(content)
+    if isinstance(content, list):
+        total = 0
+        for part in content:
+            if isinstance(part, str):
+                total += count_text(part)
+            elif isinstance(part, dict) and part.get("type") == "text":
+                total += count_text(part.get("text", ""))
+            elif isinstance(part, dict):
+                total += IMAGE_TOKENS
+        return total
+    return count_text(str(content)) if content else 0
+
+
+def count_message(message: Any) -> int:
+    """
+    Estimated tokens of one message
+    :param message: ("role", content) tuple, {"role": ..., "content": ...} dict or BaseMessage
+    :return: token estimate including the per-message overhead
+    """
+    if isinstance(message, tuple):
+        content, tool_calls = message[1], None
+    elif isinstance(message, dict):
+        content, tool_calls = message.get("content", ""), message.get("tool_calls")
+    else:
+        content, tool_calls = getattr(message, "content", ""), getattr(message, "tool_calls", None)
+    tokens = count_content(content) + MESSAGE_OVERHEAD
+    if tool_calls:
+        tokens += count_text(str(tool_calls))
+    return tokens
+
+
+def count_messages(messages: list) -> int:
+    """Estimated tokens of a list of messages."""
+    return sum(count_message(m) for m in messages)
@@ -0,0 +1,4 @@
+import os
+
+# the Groq client refuses to load without a key; the tests never reach the API
+os.environ.setdefault("GROQ_API_KEY", "test")
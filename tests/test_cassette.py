@@ -0,0 +1,16 @@
+from langchain_core.messages import HumanMessage
+
+from src.llm_chats import cassette
+
+
+def test_transport_kwargs_do_not_change_the_key():
+    messages = [HumanMessage(content="hi")]
+    plain = cassette.request_key("m", messages, None, {"tool_choice": "auto"})
+    sent = cassette.request_key("m", messages, None, {"tool_choice": "auto", "timeout": 12.3, "stream": True})
+    assert plain == sent
+
+
+def test_request_kwargs_change_the_key():
+    messages = [HumanMessage(content="hi")]
+    assert cassette.request_key("m", messages, None, {"tool_choice": "auto"}) != \
+        cassette.request_key("m", messages, None, {"tool_choice": "none"})
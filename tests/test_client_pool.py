@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+
+from src.llm_chats import client_pool
+
+
+def test_each_event_loop_gets_its_own_async_client():
+    client_pool.clear()
+
+    async def clients():
+        return client_pool._loop_client(), client_pool._loop_client()
+
+    first, again = asyncio.run(clients())
+    second, _ = asyncio.run(clients())
+    assert first is again
+    assert first is not second
+    client_pool.clear()
+
+
+def test_async_handle_sends_through_the_loop_client(monkeypatch):
+    client_pool.clear()
+    loop_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200, json={"ok": True})))
+    monkeypatch.setattr(client_pool, "_loop_client", lambda: loop_client)
+
+    async def request():
+        return (await client_pool.http_clients()[1].get("http://test/models")).json()
+
+    assert asyncio.run(request()) == {"ok": True}
+    client_pool.clear()
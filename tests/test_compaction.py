@@ -0,0 +1,36 @@
+from src.agents_utils import compaction
+from src.agents_utils.context_window import ContextWindow
+
+
+def _compactor(history: list) -> compaction.Compactor:
+    compactor = compaction.Compactor(ContextWindow(budget=10 ** 6))
+    compactor.summary, compactor.covered = "the user is called Ada", 2
+    compactor._covered_messages = history[:2]
+    return compactor
+
+
+def _has_summary(window: list) -> bool:
+    return bool(window) and window[0]["content"].startswith(compaction.SUMMARY_PREFIX)
+
+
+def test_summary_is_sent_with_its_conversation():
+    history = [{"role": "user", "content": "I am Ada"}, {"role": "assistant", "content": "Hi Ada"}]
+    compactor = _compactor(history)
+    assert _has_summary(compactor.window(history + [{"role": "user", "content": "who am I?"}]))
+
+
+def test_summary_is_not_sent_with_another_conversation():
+    history = [{"role": "user", "content": "I am Ada"}, {"role": "assistant", "content": "Hi Ada"}]
+    compactor = _compactor(history)
+    other = [{"role": "user", "content": "I am Bob"}, {"role": "assistant", "content": "Hi Bob"},
+             {"role": "user", "content": "who am I?"}]
+    assert not _has_summary(compactor.window(other))
+    assert not _has_summary(compactor.window([{"role": "user", "content": "who am I?"}]))
+
+
+def test_short_conversation_keeps_the_summary_of_another(monkeypatch):
+    monkeypatch.setattr(compaction.settings, "COMPACTION", True)
+    history = [{"role": "user", "content": "I am Ada"}, {"role": "assistant", "content": "Hi Ada"}]
+    compactor = _compactor(history)
+    assert compactor.schedule([{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}]) is None
+    assert compactor.summary and _has_summary(compactor.window(history))
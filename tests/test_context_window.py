@@ -0,0 +1,59 @@
+from src.agents_utils import context_window
+from src.agents_utils.context_window import ContextWindow
+
+
+def _history(tag: str, count: int) -> list:
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{tag} message {i} " + "word " * 20}
+            for i in range(count)]
+
+
+def test_anchor_is_kept_while_the_conversation_grows():
+    window = ContextWindow(budget=10 ** 6, max_messages=10, trim_ratio=0.5)
+    history = _history("a", 11)
+    window.select(history)
+    start = window.start(history)
+    assert start > 0
+    history += _history("a-next", 2)
+    assert window.start(history) == start
+
+
+def test_anchor_is_not_applied_to_another_conversation():
+    window = ContextWindow(budget=10 ** 6, max_messages=10, trim_ratio=0.5)
+    window.select(_history("a", 11))
+    other = _history("b", 8)
+    assert window.select(other) == other
+
+
+def test_counts_do_not_modify_the_messages():
+    history = _history("c", 4)
+    snapshot = [dict(m) for m in history]
+    window = ContextWindow(budget=10 ** 6)
+    window.select(history)
+    assert history == snapshot
+
+
+def test_counts_are_kept_per_window_and_reused(monkeypatch):
+    counted = []
+    count_message = context_window.token_count.count_message
+    monkeypatch.setattr(context_window.token_count, "count_message", lambda m: counted.append(m) or count_message(m))
+    window = ContextWindow(budget=10 ** 6)
+    history = _history("d", 4)
+    window.select(history)
+    history += _history("d-next", 2)
+    window.select(history)
+    window.start(history)
+    assert len(counted) == 6
+    window.reset()
+    assert window.tokens([]) == [] and not window._tracked
+
+
+def test_anchor_survives_a_copied_history_but_not_an_edit():
+    window = ContextWindow(budget=10 ** 6, max_messages=10, trim_ratio=0.5)
+    history = _history("e", 11)
+    window.select(history)
+    start = window.start(history)
+    assert window.start([dict(m) for m in history]) == start
+    edited = [dict(m) for m in history]
+    edited[0]["content"] = "edited"
+    window.start(edited)
+    assert window._anchor == 0
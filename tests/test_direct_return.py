@@ -0,0 +1,84 @@
+import time
+
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from src.agents_utils import direct_return, tool_cache, tool_execution
+from src.agents_utils.agent import tool_wrappers
+from src.config import settings
+
+
+class ScriptedModel(BaseChatModel):
+    """Calls one tool, then answers with the text of the tool results it saw."""
+    tool_name: str
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(**kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        results = [m.content for m in messages if isinstance(m, ToolMessage)]
+        if results:
+            message = AIMessage(content="recovered from: " + "; ".join(results))
+        else:
+            message = AIMessage(content="", tool_calls=[{"name": self.tool_name, "args": {"x": 1}, "id": "call_1"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def slow_tool(x: int) -> str:
+    """Answers too late."""
+    time.sleep(0.5)
+    return f"late {x}"
+
+
+@tool
+def broken_tool(x: int) -> str:
+    """Always raises."""
+    raise ValueError("bad input")
+
+
+@tool
+def fine_tool(x: int) -> str:
+    """Answers directly."""
+    return str(x)
+
+
+direct_return.mark(tool_execution.configure(slow_tool, timeout=0.05))
+direct_return.mark(broken_tool)
+direct_return.mark(fine_tool, template="x = {result}")
+
+
+def _run(tool_, monkeypatch) -> tuple[ScriptedModel, str]:
+    monkeypatch.setattr(settings, "TOOL_MAX_RETRIES", 0)
+    tool_cache.get_cache().clear()
+    model = ScriptedModel(tool_name=tool_.name)
+    graph = create_agent(model, [tool_], middleware=tool_wrappers())
+    state = graph.invoke({"messages": [{"role": "user", "content": "go"}]})
+    return model, direct_return.final_answer(state["messages"])
+
+
+def test_timeout_goes_back_to_the_model(monkeypatch):
+    model, answer = _run(slow_tool, monkeypatch)
+    assert model.calls == 2
+    assert answer.startswith("recovered from: Error: tool slow_tool timed out")
+
+
+def test_exception_goes_back_to_the_model(monkeypatch):
+    model, answer = _run(broken_tool, monkeypatch)
+    assert model.calls == 2
+    assert answer.startswith("recovered from: Error: tool broken_tool failed: bad input")
+
+
+def test_success_ends_the_turn(monkeypatch):
+    model, answer = _run(fine_tool, monkeypatch)
+    assert model.calls == 1
+    assert answer == "x = 1"
@@ -0,0 +1,20 @@
+from src.agents_utils import graph_registry
+from src.config import settings
+
+
+def _compiled(name: str) -> graph_registry.CompiledAgent:
+    return graph_registry.CompiledAgent(name, None, None, ())
+
+
+def test_least_recently_used_graph_is_evicted(monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_REGISTRY_ITEMS", 2)
+    graph_registry.clear()
+    graph_registry.get_or_create(("a",), lambda: _compiled("a"))
+    graph_registry.get_or_create(("b",), lambda: _compiled("b"))
+    graph_registry.get_or_create(("a",), lambda: _compiled("a again"))
+    graph_registry.get_or_create(("c",), lambda: _compiled("c"))
+
+    assert graph_registry.get_or_create(("a",), lambda: _compiled("a rebuilt")).graph == "a"
+    assert graph_registry.get_or_create(("b",), lambda: _compiled("b rebuilt")).graph == "b rebuilt"
+    graph_registry.clear()
+
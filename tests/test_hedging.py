@@ -0,0 +1,28 @@
+import asyncio
+
+from src.llm_chats import hedging
+
+
+def _tracker(monkeypatch) -> hedging.LatencyTracker:
+    tracker = hedging.LatencyTracker(window=10, min_samples=1)
+    monkeypatch.setattr(hedging, "primary_latency", tracker)
+    return tracker
+
+
+async def _answer(seconds: float, text: str) -> str:
+    await asyncio.sleep(seconds)
+    return text
+
+
+def test_hedge_win_records_a_censored_primary_latency(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    result = asyncio.run(hedging.hedged(lambda: _answer(1.0, "primary"), lambda: _answer(0.05, "backup"), delay=0.05))
+    assert result == ("backup", "backup")
+    assert tracker.percentile(50) >= 0.1
+
+
+def test_primary_win_records_its_latency(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    result = asyncio.run(hedging.hedged(lambda: _answer(0.01, "primary"), lambda: _answer(0.01, "backup"), delay=0.5))
+    assert result == ("primary", "primary")
+    assert 0.01 <= tracker.percentile(50) < 0.5
@@ -0,0 +1,21 @@
+import base64
+
+from PIL import Image
+
+from src.utils import image_preprocessing
+
+
+def test_undecodable_file_is_sent_as_it_is(tmp_path):
+    path = tmp_path / "not_an_image.png"
+    path.write_bytes(b"plain text, not a png")
+    url = image_preprocessing.to_data_url(str(path))
+    assert url == "data:image/png;base64," + base64.b64encode(b"plain text, not a png").decode("ascii")
+
+
+def test_image_is_downscaled(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_preprocessing.settings, "IMAGE_MAX_SIDE", 64)
+    monkeypatch.setattr(image_preprocessing.settings, "IMAGE_FORMAT", "JPEG")
+    path = tmp_path / "large.png"
+    Image.new("RGB", (640, 320), (200, 30, 30)).save(path)
+    url = image_preprocessing.to_data_url(str(path))
+    assert url.startswith("data:image/jpeg;base64,")
@@ -0,0 +1,15 @@
+import pytest
+
+from src.agents_utils.query_router import QueryRouter
+
+
+@pytest.mark.parametrize("query", ["hi", "Hi there!", "ok, thanks", "thank you so much :)", "good morning",
+                                   "How are you?", "bye"])
+def test_small_talk_takes_the_light_path(query):
+    assert QueryRouter.decide(query).route == "light"
+
+
+@pytest.mark.parametrize("query", ["yes", "sure", "no", "hi, what's the capital of Peru?", "thanks, now in Tokyo?",
+                                   "who wrote Dune?", "ok do it"])
+def test_everything_else_takes_the_full_path(query):
+    assert QueryRouter.decide(query).route == "full"
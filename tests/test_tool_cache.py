@@ -0,0 +1,91 @@
+import asyncio
+
+from langchain.agents.middleware import ToolCallRequest
+from langchain_core.messages import ToolMessage
+
+from src.agents_utils import tool_cache
+
+
+def _request(name: str, args: dict, call_id: str) -> ToolCallRequest:
+    return ToolCallRequest(tool_call={"name": name, "args": args, "id": call_id}, tool=None, state=None, runtime=None)
+
+
+def test_mcp_error_text_is_not_cached():
+    tool_cache.get_cache().clear()
+    stores = tool_cache.get_cache().stats["stores"]
+    calls = []
+
+    async def handler(request):
+        calls.append(request.tool_call["id"])
+        return ToolMessage(
+            content="Error happened during search call: 503 Server Error: Service Unavailable. Check the error "
+                    "and try again.",
+            tool_call_id=request.tool_call["id"], name="search",
+        )
+
+    middleware = tool_cache.ToolCacheMiddleware()
+    first = asyncio.run(middleware.awrap_tool_call(_request("search", {"query": "x"}, "a"), handler))
+    second = asyncio.run(middleware.awrap_tool_call(_request("search", {"query": "x"}, "b"), handler))
+
+    assert first.content.startswith("Error happened")
+    assert second.tool_call_id == "b"
+    assert calls == ["a", "b"]
+    assert tool_cache.get_cache().stats["stores"] == stores
+
+
+def test_successful_result_is_cached():
+    tool_cache.get_cache().clear()
+    calls = []
+
+    async def handler(request):
+        calls.append(request.tool_call["id"])
+        return ToolMessage(content="results", tool_call_id=request.tool_call["id"], name="search")
+
+    middleware = tool_cache.ToolCacheMiddleware()
+    asyncio.run(middleware.awrap_tool_call(_request("search", {"query": "y"}, "a"), handler))
+    cached = asyncio.run(middleware.awrap_tool_call(_request("search", {"query": "y"}, "b"), handler))
+
+    assert calls == ["a"]
+    assert cached.content == "results" and cached.tool_call_id == "b"
+
+
+def test_cancelled_owner_does_not_cancel_the_waiters():
+    tool_cache.get_cache().clear()
+    calls = []
+
+    async def handler(request):
+        calls.append(request.tool_call["id"])
+        await asyncio.sleep(0.1)
+        return ToolMessage(content="results", tool_call_id=request.tool_call["id"], name="search")
+
+    async def run():
+        middleware = tool_cache.ToolCacheMiddleware()
+        owner = asyncio.create_task(middleware.awrap_tool_call(_request("search", {"query": "z"}, "a"), handler))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(middleware.awrap_tool_call(_request("search", {"query": "z"}, "b"), handler))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await waiter
+
+    result = asyncio.run(run())
+    assert result.content == "results" and result.tool_call_id == "b"
+    assert calls == ["a", "b"]
+
+
+def test_cancelled_waiter_does_not_cancel_the_owner():
+    tool_cache.get_cache().clear()
+
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return ToolMessage(content="results", tool_call_id=request.tool_call["id"], name="search")
+
+    async def run():
+        middleware = tool_cache.ToolCacheMiddleware()
+        owner = asyncio.create_task(middleware.awrap_tool_call(_request("search", {"query": "w"}, "a"), handler))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(middleware.awrap_tool_call(_request("search", {"query": "w"}, "b"), handler))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(run()).content == "results"
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+from langchain.agents.middleware import ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import tool
+
+from src.agents_utils import tool_execution
+
+
+@tool
+def single_slot_tool(x: int) -> str:
+    """One call at a time."""
+    return str(x)
+
+
+tool_execution.configure(single_slot_tool, max_concurrency=1, timeout=0.05)
+
+
+def _request(call_id: str) -> ToolCallRequest:
+    call = {"name": single_slot_tool.name, "args": {"x": 1}, "id": call_id}
+    return ToolCallRequest(tool_call=call, tool=single_slot_tool, state=None, runtime=None)
+
+
+def test_timed_out_sync_call_keeps_its_slot_until_it_finishes():
+    release = threading.Event()
+    started = []
+
+    def handler(request):
+        started.append(request.tool_call["id"])
+        if request.tool_call["id"] == "slow":
+            release.wait(5)
+        return ToolMessage(content="done", tool_call_id=request.tool_call["id"])
+
+    middleware = tool_execution.ToolExecutionMiddleware()
+    timed_out = middleware.wrap_tool_call(_request("slow"), handler)
+    assert timed_out.status == "error" and "timed out" in timed_out.content
+
+    # the slow worker still runs, so the next call waits for the slot instead of running next to it
+    waiting = threading.Thread(target=middleware.wrap_tool_call, args=(_request("next"), handler))
+    waiting.start()
+    time.sleep(0.1)
+    assert started == ["slow"]
+    release.set()
+    waiting.join(5)
+    assert started == ["slow", "next"]
+
+
+def test_timed_out_async_call_of_a_sync_tool_keeps_its_slot():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    @tool
+    def ocr_tool(x: int) -> str:
+        """Slow sync work."""
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+        return str(x)
+
+    tool_execution.configure(ocr_tool, max_concurrency=1, timeout=0.05)
+
+    async def handler(request):
+        # what the tool node does with the request's tool
+        return await request.tool.ainvoke({**request.tool_call, "type": "tool_call"})
+
+    async def run():
+        middleware = tool_execution.ToolExecutionMiddleware()
+        calls = [ToolCallRequest(tool_call={"name": "ocr_tool", "args": {"x": i}, "id": str(i)}, tool=ocr_tool,
+                                 state=None, runtime=None) for i in range(3)]
+        results = await asyncio.gather(*(middleware.awrap_tool_call(c, handler) for c in calls))
+        await asyncio.sleep(0.5)
+        return results
+
+    results = asyncio.run(run())
+    assert all(r.status == "error" and "timed out" in r.content for r in results)
+    assert peak[0] == 1